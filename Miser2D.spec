@@ -1,11 +1,19 @@
 # -*- mode: python ; coding: utf-8 -*-
+import sys
+sys.path.insert(0, SPECPATH)
+from assetpack import build
+from i18n import build as build_locales
 
+# every image, sound and font goes into one indexed pack
+build(SPECPATH)
+# and every language into a compiled catalog
+build_locales()
 
 a = Analysis(
     ['testursina.py'],
     pathex=[],
     binaries=[],
-    datas=[('trash_bin.png', '.')],
+    datas=[('assets.pack', '.'), ('locales/*.mcat', 'locales')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
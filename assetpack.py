@@ -0,0 +1,99 @@
+# Miser 2D - Packed asset bundle
+# All images, sounds and fonts in one Panda3D multifile. The pack is
+# overlaid on the asset folder in Panda3D's virtual file system, so every
+# Panda loader (textures, fonts, ffmpeg audio) finds packed files by their
+# usual names; anything not in the pack falls through to loose files.
+# Mounting only reads the pack's index: a file's bytes are read from its
+# offset in the pack when a loader opens it, so startup stays lazy. A pack
+# that cannot be read (damaged, or from an older build) is skipped with a
+# warning and the game runs from loose files; rebuild it with the line below.
+#
+#   python assetpack.py            # pack this folder into assets.pack
+#   python assetpack.py --list     # show what an existing pack holds
+
+import argparse, os, sys
+from pathlib import Path
+from panda3d.core import Filename, Multifile, VirtualFileSystem, getModelPath
+
+PACK_NAME = 'assets.pack'
+PACK_TYPES = ('.png', '.jpg', '.mp3', '.wav', '.ogg', '.ttf', '.otf')
+
+
+class AssetPack:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.multifile = Multifile()
+        if not self.multifile.openRead(Filename.fromOsSpecific(str(self.path))):
+            raise ValueError(f'{path} is not an asset pack')
+        self.entries = {self.multifile.getSubfileName(i): i for i in range(self.multifile.getNumSubfiles())}
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def version(self, name):
+        # changes whenever the packed file does (size, and mtime when packed)
+        i = self.entries[name]
+        return self.multifile.getSubfileLength(i), self.multifile.getSubfileTimestamp(i)
+
+    def mount(self, folder):
+        root = Filename.fromOsSpecific(str(Path(folder).resolve()))
+        VirtualFileSystem.getGlobalPtr().mount(self.multifile, root, VirtualFileSystem.MF_read_only)
+
+    def close(self):
+        VirtualFileSystem.getGlobalPtr().unmount(self.multifile)
+        self.multifile.close()
+
+
+def build(folder='.', out=None, names=None):
+    folder = Path(folder)
+    out = Path(out) if out else folder / PACK_NAME
+    if names is None:
+        names = sorted(p.name for p in folder.iterdir() if p.suffix.lower() in PACK_TYPES)
+    tmp = out.with_suffix(f'.{os.getpid()}.tmp')
+    pack = Multifile()
+    if not pack.openWrite(Filename.fromOsSpecific(str(tmp))):
+        raise OSError(f'cannot write {tmp}')
+    for name in names:
+        # stored as is: images, sounds and fonts barely compress
+        pack.addSubfile(name, Filename.binaryFilename(Filename.fromOsSpecific(str(folder / name))), 0)
+    pack.close()
+    os.replace(tmp, out)
+    return out
+
+
+def mount(folder, name=PACK_NAME):
+    # the pack sits next to the game, or inside a one-file build's bundle;
+    # without a readable one the game runs from loose files as before
+    folder = Path(folder)
+    getModelPath().appendDirectory(str(folder.resolve()))
+    for where in (folder, getattr(sys, '_MEIPASS', None)):
+        if where is not None and (Path(where) / name).is_file():
+            try:
+                pack = AssetPack(Path(where) / name)
+            except ValueError as e:
+                print(f'assetpack: {e}; using loose files (python assetpack.py rebuilds it)')
+                continue
+            pack.mount(folder)
+            return pack
+    return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pack Miser 2D assets into one file')
+    parser.add_argument('folder', nargs='?', default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument('-o', '--out', help=f'output file (default: <folder>/{PACK_NAME})')
+    parser.add_argument('--list', action='store_true', help='list the contents of an existing pack')
+    args = parser.parse_args()
+
+    path = args.out or os.path.join(args.folder, PACK_NAME)
+    if not args.list:
+        build(args.folder, path)
+    pack = AssetPack(path)
+    for name, i in pack.entries.items():
+        print(f'{name:<24}{pack.multifile.getSubfileLength(i):>10} bytes  '
+              f'@{pack.multifile.getSubfileInternalStart(i)}')
+    print(f'{len(pack)} files, {os.path.getsize(path)} bytes')
+    pack.close()
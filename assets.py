@@ -0,0 +1,177 @@
+# Miser 2D - Lazy asset loading
+# The first frame goes up before sounds, fonts and textures are in. A worker
+# thread decodes MP3s into a WAV cache on disk (later launches skip the
+# decode), loads or builds the text's glyph atlas (fontatlas.py), warms the
+# texture pool, and the main thread hands the sounds to Panda3D's async
+# loader. Until a clip arrives its LazySound plays silence. Startup timings
+# are measured from the moment this module is imported, so import it before
+# ursina.
+
+import time
+STARTED = time.perf_counter()
+
+import hashlib, math, os, queue, threading, wave
+from pathlib import Path
+from panda3d.core import Datagram, Filename, MovieAudio, TexturePool, VirtualFileSystem
+
+CACHE_DIR = Path(os.environ.get('MISER_CACHE', Path.home() / '.cache' / 'miser2d'))
+DECODE_VERSION = 2    # part of the WAV cache key: bump when decoding changes
+
+
+class LazySound:
+    # stands in for Audio(name, autoplay=False) until the clip is loaded
+    def __init__(self, name, volume=1):
+        self.name = name
+        self.volume = volume
+        self.clip = None
+
+    def play(self):
+        if self.clip is not None:
+            self.clip.play()
+
+    def _ready(self, clip):
+        from ursina import Audio
+        clip.setVolume(self.volume * Audio.volume_multiplier)
+        self.clip = clip
+
+
+class AssetLoader:
+    def __init__(self, folder, pack=None, cache_dir=CACHE_DIR, report=True):
+        # pack is an assetpack.AssetPack already mounted over folder, or None
+        self.folder = Path(folder)
+        self.pack = pack
+        self.cache_dir = Path(cache_dir)
+        self.report = report
+        self.jobs = queue.Queue()   # worker input: (kind, name, target)
+        self.done = queue.Queue()   # main-thread input: (kind, target, result)
+        self.pending = 0
+        self.timings = {}           # 'first_frame' / 'assets_ready' -> ms since import
+        self.thread = None
+
+    # ----- Requests -----
+    def sound(self, name, volume=1):
+        sound = LazySound(name, volume)
+        self._queue('sound', name, sound)
+        return sound
+
+    def font(self, name, chars, ready):
+        # the glyph atlas of font `name` for `chars`, passed to ready(font)
+        # on the main thread; text keeps the font it has until then
+        self._queue('font', name, (chars, ready))
+
+    def texture(self, name, entity, **attrs):
+        # attrs are set together with the texture (e.g. undo a placeholder color)
+        self._queue('texture', name, (entity, attrs))
+
+    def _queue(self, kind, name, target):
+        self.pending += 1
+        self.jobs.put((kind, name, target))
+
+    def start(self):
+        from ursina import application
+        self.thread = threading.Thread(target=self._work, name='asset-loader', daemon=True)
+        self.thread.start()
+        # sort 55 runs after igLoop (50), so the first call sees a drawn frame
+        application.base.taskMgr.add(self._poll, 'asset_loader', sort=55)
+
+    # ----- Worker thread -----
+    def _work(self):
+        while True:
+            kind, name, target = self.jobs.get()
+            path = None if kind == 'font' else self.find(name)
+            result = None
+            try:
+                if kind == 'font':
+                    # fontatlas finds the font itself: it may be one of ursina's
+                    import fontatlas
+                    result = fontatlas.load(name, target[0], self.folder, self.cache_dir)
+                elif path is None:
+                    print(f'asset {name} not found in {self.folder}')
+                elif kind == 'sound':
+                    result = self.decoded(name, path)
+                else:
+                    result = TexturePool.loadTexture(path)
+            except Exception as e:
+                print(f'asset {name} failed to load: {e}')
+            self.done.put((kind, target, result))
+
+    def find(self, name):
+        # a Panda Filename, so packed files (mounted in the VFS) resolve too
+        path = Filename.fromOsSpecific(str((self.folder / name).resolve()))
+        if VirtualFileSystem.getGlobalPtr().exists(path):
+            return path
+        loose = next(self.folder.glob(f'**/{name}'), None)
+        return Filename.fromOsSpecific(str(loose)) if loose else None
+
+    def decoded(self, name, path):
+        # MP3 -> 16-bit WAV, keyed on the file's size and mtime (packed or
+        # loose) so edited sounds re-decode
+        if Path(name).suffix.lower() in ('.wav', '.ogg'):
+            return path
+        if self.pack is not None and name in self.pack:
+            size, mtime = self.pack.version(name)
+            source = f'{DECODE_VERSION}:{name}:{size}:{mtime}'
+        else:
+            st = os.stat(path.toOsSpecific())
+            source = f'{DECODE_VERSION}:{path}:{st.st_size}:{st.st_mtime_ns}'
+        key = hashlib.sha1(source.encode()).hexdigest()[:16]
+        cached = self.cache_dir / f'{Path(name).stem}-{key}.wav'
+        if cached.is_file():
+            return Filename.fromOsSpecific(str(cached))
+        cursor = MovieAudio.get(path).open()
+        if cursor is None:
+            return path
+        rate, channels = cursor.audioRate(), cursor.audioChannels()
+        # the cursor pads with silence past the end instead of stopping, so
+        # take exactly the clip's length in whole frames
+        count = math.ceil(cursor.length() * rate)
+        samples = Datagram()
+        cursor.readSamples(count, samples)
+        data = samples.getMessage()[:count * 2 * channels]
+        data += b'\0' * (-len(data) % (2 * channels))
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = cached.with_suffix(f'.{os.getpid()}.tmp')
+            with wave.open(str(tmp), 'wb') as out:
+                out.setnchannels(channels)
+                out.setsampwidth(2)
+                out.setframerate(rate)
+                out.writeframes(data)
+            os.replace(tmp, cached)
+        except OSError:
+            return path   # read-only home: decode again next launch
+        return Filename.fromOsSpecific(str(cached))
+
+    # ----- Main thread -----
+    def _poll(self, task):
+        from ursina import application, Texture
+        if 'first_frame' not in self.timings:
+            self.timings['first_frame'] = (time.perf_counter() - STARTED) * 1000
+        while not self.done.empty():
+            kind, target, result = self.done.get()
+            if result is None:
+                self._finished()
+            elif kind == 'sound':
+                application.base.loader.loadSfx(result.getFullpath(), callback=self._sound_loaded, extraArgs=[target])
+            elif kind == 'font':
+                target[1](result)
+                self._finished()
+            else:
+                entity, attrs = target
+                entity.texture = Texture(result)
+                for key, value in attrs.items():
+                    setattr(entity, key, value)
+                self._finished()
+        return task.cont
+
+    def _sound_loaded(self, clip, sound):
+        sound._ready(clip)
+        self._finished()
+
+    def _finished(self):
+        self.pending -= 1
+        if self.pending == 0 and 'assets_ready' not in self.timings:
+            self.timings['assets_ready'] = (time.perf_counter() - STARTED) * 1000
+            if self.report:
+                print(f"startup: first frame {self.timings.get('first_frame', 0):.0f} ms, "
+                      f"assets ready {self.timings['assets_ready']:.0f} ms")
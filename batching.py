@@ -0,0 +1,257 @@
+# Miser 2D - Batched sprite and label rendering
+# Static interactables are drawn from one vertex buffer per batch instead of
+# one Entity (and draw call) each. Every sprite samples a shared atlas, with
+# a white patch for flat-colored quads, so bins and vendors in a batch
+# share one texture. Per-instance tint is rewritten in place in the vertex
+# colors, so cooldown highlights never rebuild the batch. Crowds of moving
+# sprites are one quad drawn with hardware instancing, positions streamed
+# from a NumPy array each frame.
+
+import builtins, math
+import numpy as np
+from panda3d.core import (
+    Filename, Geom, GeomEnums, GeomNode, GeomTriangles, GeomVertexData, GeomVertexFormat, GeomVertexWriter,
+    OmniBoundingVolume, PNMImage, Shader, Texture as PandaTexture, TextNode, TransparencyAttrib,
+    VirtualFileSystem, getModelPath,
+)
+from ursina import scene, load_texture, color
+
+WHITE = 'white'
+
+
+class SpriteAtlas:
+    def __init__(self, names, padding=2):
+        images = [(WHITE, _white_image())]
+        for name in names:
+            image = _load_image(name)
+            if not image.hasAlpha():
+                image.addAlpha()
+                image.alphaFill(1)
+            images.append((name, image))
+
+        # shelf packing into a power-of-two square, tallest sprites first
+        area = sum((i.getXSize() + padding) * (i.getYSize() + padding) for _, i in images)
+        widest = max(i.getXSize() for _, i in images) + padding
+        size = 1 << math.ceil(math.log2(max(widest, math.sqrt(area) * 1.25)))
+        while True:
+            placed = _shelf_pack(images, size, padding)
+            if placed is not None:
+                break
+            size *= 2
+
+        atlas = PNMImage(size, size, 4)
+        atlas.fill(0, 0, 0)
+        atlas.alphaFill(0)
+        self.uv = {}
+        for name, image, x, y in placed:
+            atlas.copySubImage(image, x, y)
+            w, h = image.getXSize(), image.getYSize()
+            # half-texel inset keeps linear filtering inside the sprite
+            self.uv[name] = (
+                (x + 0.5) / size, 1 - (y + h - 0.5) / size,
+                (x + w - 0.5) / size, 1 - (y + 0.5) / size,
+            )
+        self.texture = PandaTexture('sprite_atlas')
+        self.texture.load(atlas)
+        self.size = size
+
+
+class SpriteBatch:
+    # add() sprites, then build() once; afterwards only set_tint() per instance
+    def __init__(self, atlas, parent=scene, z=0.01, name='sprite_batch'):
+        self.atlas = atlas
+        self.parent = parent
+        self.z = z
+        self.name = name
+        self.sprites = []
+        self.node = None
+
+    def __len__(self):
+        return len(self.sprites)
+
+    def add(self, x, y, width, height, sprite=WHITE, tint=color.white):
+        self.sprites.append((x, y, width, height, sprite, tuple(tint)))
+        return len(self.sprites) - 1
+
+    def build(self):
+        vdata = GeomVertexData(self.name, GeomVertexFormat.getV3c4t2(), Geom.UHDynamic)
+        vdata.setNumRows(4 * len(self.sprites))
+        vertex = GeomVertexWriter(vdata, 'vertex')
+        tint = GeomVertexWriter(vdata, 'color')
+        uv = GeomVertexWriter(vdata, 'texcoord')
+        tris = GeomTriangles(Geom.UHStatic)
+        z = self.z
+        for i, (x, y, w, h, sprite, rgba) in enumerate(self.sprites):
+            u0, v0, u1, v1 = self.atlas.uv[sprite]
+            x0, x1, y0, y1 = x - w / 2, x + w / 2, y - h / 2, y + h / 2
+            for vx, vy, tu, tv in ((x0, y0, u0, v0), (x1, y0, u1, v0), (x1, y1, u1, v1), (x0, y1, u0, v1)):
+                vertex.addData3(vx, vy, z)
+                tint.addData4(*rgba)
+                uv.addData2(tu, tv)
+            base = 4 * i
+            tris.addVertices(base, base + 1, base + 2)
+            tris.addVertices(base, base + 2, base + 3)
+
+        geom = Geom(vdata)
+        geom.addPrimitive(tris)
+        self.geom_node = GeomNode(self.name)
+        self.geom_node.addGeom(geom)
+        self.node = self.parent.attachNewNode(self.geom_node)
+        self.node.setTexture(self.atlas.texture)
+        self.node.setTransparency(TransparencyAttrib.MAlpha)
+        self.node.setTwoSided(True)
+        self.node.setLightOff()
+        return self
+
+    def set_tint(self, index, tint):
+        vdata = self.geom_node.modifyGeom(0).modifyVertexData()
+        writer = GeomVertexWriter(vdata, 'color')
+        writer.setRow(4 * index)
+        rgba = tuple(tint)
+        for _ in range(4):
+            writer.setData4(*rgba)
+
+    def destroy(self):
+        if self.node is not None:
+            self.node.removeNode()
+            self.node = None
+
+
+class LabelBatch:
+    # in-world labels baked into geometry and flattened into one node
+    def __init__(self, font, parent=scene, z=0, name='label_batch'):
+        # a font name, or a loaded TextFont (e.g. a fontatlas atlas)
+        self.font = builtins.loader.loadFont(font) if isinstance(font, str) else font
+        self.root = parent.attachNewNode(name)
+        self.z = z
+
+    def add(self, text, x, y, scale, tint=color.black):
+        tn = TextNode('label')
+        tn.setFont(self.font)
+        tn.setAlign(TextNode.ACenter)
+        tn.setTextColor(*tuple(tint))
+        tn.setText(text)
+        label = self.root.attachNewNode(tn.generate())
+        label.setPos(x, y, self.z)
+        label.setScale(scale)
+
+    def build(self):
+        self.root.flattenStrong()
+        self.root.setLightOff()
+        return self
+
+    def destroy(self):
+        self.root.removeNode()
+
+
+_CROWD_VERTEX = '''#version 140
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform samplerBuffer offsets;
+in vec4 p3d_Vertex;
+void main() {
+    vec2 offset = texelFetch(offsets, gl_InstanceID).xy;
+    gl_Position = p3d_ModelViewProjectionMatrix * vec4(p3d_Vertex.xy + offset, p3d_Vertex.z, 1);
+}
+'''
+
+_CROWD_FRAGMENT = '''#version 140
+uniform vec4 tint;
+out vec4 p3d_FragColor;
+void main() {
+    p3d_FragColor = tint;
+}
+'''
+
+
+class CrowdSprites:
+    # `count` flat-colored quads that all move every frame. With GLSL
+    # instancing the quad is drawn count times and the shader offsets each
+    # copy from a buffer texture of (x, y) pairs; without it (software
+    # renderers) one dynamic vertex buffer is rewritten. Either way it is
+    # one draw call and one array copy per frame.
+    def __init__(self, count, size, tint=color.white, parent=scene, z=0.02, name='crowd'):
+        self.count = count
+        gsg = builtins.base.win.getGsg()
+        self.instanced = bool(gsg and gsg.getSupportsGlsl() and gsg.getSupportsGeometryInstancing()
+                              and gsg.getSupportsBufferTexture())
+        half = size / 2
+        corners = np.array([(-half, -half), (half, -half), (half, half), (-half, half)], np.float32)
+        quads = 1 if self.instanced else count
+
+        vdata = GeomVertexData(name, GeomVertexFormat.getV3(), Geom.UHStatic if self.instanced else Geom.UHDynamic)
+        vdata.setNumRows(4 * quads)
+        vertices = np.frombuffer(vdata.modifyArray(0), np.float32).reshape(quads, 4, 3)
+        vertices[:, :, :2] = corners
+        vertices[:, :, 2] = z
+        tris = GeomTriangles(Geom.UHStatic)
+        for i in range(quads):
+            tris.addVertices(4 * i, 4 * i + 1, 4 * i + 2)
+            tris.addVertices(4 * i, 4 * i + 2, 4 * i + 3)
+        geom = Geom(vdata)
+        geom.addPrimitive(tris)
+        self.geom_node = GeomNode(name)
+        self.geom_node.addGeom(geom)
+        # agents roam anywhere, so never cull against the template quad
+        self.geom_node.setBounds(OmniBoundingVolume())
+        self.geom_node.setFinal(True)
+        self.node = parent.attachNewNode(self.geom_node)
+        self.node.setLightOff()
+        self.node.setTwoSided(True)
+
+        if self.instanced:
+            self.offsets = PandaTexture(f'{name}_offsets')
+            self.offsets.setupBufferTexture(count, PandaTexture.T_float, PandaTexture.F_rg32, GeomEnums.UH_dynamic)
+            self.node.setShader(Shader.make(Shader.SL_GLSL, _CROWD_VERTEX, _CROWD_FRAGMENT))
+            self.node.setShaderInput('offsets', self.offsets)
+            self.node.setShaderInput('tint', tuple(tint))
+            self.node.setInstanceCount(count)
+        else:
+            self.corners = corners
+            self.node.setColor(tuple(tint))
+
+    def update(self, xy):
+        # xy: float32 array of shape (count, 2)
+        if self.instanced:
+            np.frombuffer(self.offsets.modifyRamImage(), np.float32).reshape(self.count, 2)[:] = xy
+        else:
+            vdata = self.geom_node.modifyGeom(0).modifyVertexData()
+            vertices = np.frombuffer(vdata.modifyArray(0), np.float32).reshape(self.count, 4, 3)
+            vertices[:, :, :2] = xy[:, None, :] + self.corners
+
+    def destroy(self):
+        if self.node is not None:
+            self.node.removeNode()
+            self.node = None
+
+
+def _load_image(name):
+    # model-path lookup goes through the VFS, so packed sprites are found;
+    # ursina's own search (subfolders, built-in textures) is the fallback
+    image = PNMImage()
+    path = Filename(name)
+    if VirtualFileSystem.getGlobalPtr().resolveFilename(path, getModelPath().getValue()) and image.read(path):
+        return image
+    load_texture(name)._texture.store(image)
+    return image
+
+
+def _white_image():
+    image = PNMImage(4, 4, 4)
+    image.fill(1, 1, 1)
+    image.alphaFill(1)
+    return image
+
+
+def _shelf_pack(images, size, padding):
+    placed = []
+    x = y = shelf = 0
+    for name, image in sorted(images, key=lambda e: -e[1].getYSize()):
+        w, h = image.getXSize(), image.getYSize()
+        if x + w > size:
+            x, y, shelf = 0, y + shelf + padding, 0
+        if y + h > size:
+            return None
+        placed.append((name, image, x, y))
+        x += w + padding
+        shelf = max(shelf, h)
+    return placed
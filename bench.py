@@ -0,0 +1,250 @@
+# Miser 2D - Headless benchmarks
+# Runs the simulation core (no window, no GPU) through a sweep of world
+# sizes, concurrent searches, NPC crowds, vendor markets, inventory sizes
+# and HUD text paths, and reports ticks/s, per-tick time percentiles and peak traced
+# memory.
+#
+#   python bench.py --out results.json
+#   python bench.py --quick --baseline results.json
+
+import argparse, json, math, platform, random, sys, time, tracemalloc
+from miser_core import World, MaterialType
+
+DT = 1 / 60
+
+
+# ----- Scenarios -----
+# each scenario returns (setup, tick): setup() builds state, tick(state, n) runs one frame
+
+def world_size(bins, vendors):
+    def setup():
+        world = World(seed=1)
+        side = math.sqrt(bins) * 2  # keep density constant as the map grows
+        for _ in range(bins):
+            world.add_bin(world.rng.uniform(-side, side), world.rng.uniform(-side, side))
+        accepts = [MaterialType.Paper, MaterialType.Cloth, MaterialType.Iron, MaterialType.Glass, MaterialType.Jewelry]
+        for i in range(vendors):
+            world.add_vendor(f'Vendor {i}', accepts[i % len(accepts)], world.rng.uniform(-side, side), world.rng.uniform(-side, side))
+        world.drain_events()
+        return {'world': world, 'bot': random.Random(2), 'move': (0, 0)}
+
+    def tick(state, n):
+        world = state['world']
+        if n % 60 == 0:
+            bot = state['bot']
+            state['move'] = (bot.choice((-1, 0, 1)), bot.choice((-1, 0, 1)))
+        world.step(DT, {'move': state['move'], 'keys': ('e',) if n % 15 == 0 else ()})
+        world.drain_events()
+    return setup, tick
+
+
+def concurrent_searches(searches):
+    def setup():
+        world = World(seed=1, cooldown_time=0.5)
+        side = math.sqrt(searches) * 2
+        for _ in range(searches):
+            world.add_bin(world.rng.uniform(-side, side), world.rng.uniform(-side, side))
+        world.drain_events()
+        return {'world': world}
+
+    def tick(state, n):
+        world = state['world']
+        # restart every idle bin so `searches` timers stay in flight
+        if n % 30 == 0:
+            for b in world.bins:
+                if not b.searching and world.cooldown(b) == 0:
+                    world.search(b)
+        world.step(DT)
+        world.drain_events()
+    return setup, tick
+
+
+def scavenger_crowd(count):
+    def setup():
+        from chunks import streamed_world
+        from scavengers import Scavengers
+        from nav import NavGrid
+        world, chunks = streamed_world(1)
+        nav = NavGrid(world)
+        crowd = Scavengers(world, count, 1, nav=nav)
+        world.drain_events()
+        return {'world': world, 'nav': nav, 'crowd': crowd}
+
+    def tick(state, n):
+        # world step plus the batched crowd step (flow fields included),
+        # standing still in the start chunk
+        state['world'].step(DT)
+        state['nav'].step()
+        state['crowd'].step(DT)
+        state['world'].drain_events()
+    return setup, tick
+
+
+def vendor_market(vendors):
+    def setup():
+        import numpy as np
+        world = World(seed=1)
+        accepts = [MaterialType.Paper, MaterialType.Cloth, MaterialType.Iron, MaterialType.Glass, MaterialType.Jewelry]
+        for i in range(vendors):
+            world.add_vendor(f'Vendor {i}', accepts[i % len(accepts)], i, 0)
+        world.drain_events()
+        # the sales are drawn up front so only the market is timed
+        rng = np.random.default_rng(2)
+        sales = max(1, vendors // 10)
+        slots = np.array([v.slot for v in world.vendors])
+        batches = [(slots[rng.integers(vendors, size=sales)], rng.integers(6, 51, sales)) for _ in range(64)]
+        return {'world': world, 'batches': batches}
+
+    def tick(state, n):
+        # prices recover while a batch of sales (one per ten vendors) lands
+        world = state['world']
+        world.step(DT)
+        world.market.sell_many(*state['batches'][n % 64], world.time)
+    return setup, tick
+
+
+def inventory_size(items):
+    def setup():
+        world = World(seed=1)
+        for _ in range(items):
+            world.inventory.add(world.loot.roll_item(world.loot_rng))
+        return {'world': world}
+
+    def tick(state, n):
+        # one pickup, one HUD rebuild (the string is what is timed), and a sale every second
+        world = state['world']
+        world.inventory.add(world.loot.roll_item(world.loot_rng))
+        state['hud'] = 'Inventory: ' + ', '.join(f'{key} x{k}' for key, k in world.inventory.summary())
+        if n % 60 == 0:
+            world.inventory.take(MaterialType.Paper)
+    return setup, tick
+
+
+def text_path(kind):
+    # per-frame tooltip + coin counter text, through the compiled catalogs
+    def setup():
+        state = {'coins': 0, 'cooldown': 10.0}
+        if kind == 'arabic_uncached':
+            import shaping
+            state['shape'] = shaping.shape.__wrapped__
+        else:
+            import i18n
+            state['catalog'] = i18n.load('en' if kind == 'latin' else 'ar')
+        return state
+
+    def tick(state, n):
+        state['coins'] += 1
+        state['cooldown'] = max(0, state['cooldown'] - DT) or 10.0
+        if kind == 'arabic_uncached':  # what every frame cost before shaping was cached
+            shape = state['shape']
+            shape(f"الانتظار: {int(state['cooldown'])} ث")
+            shape(f"العملات: {state['coins']}")
+        else:
+            catalog = state['catalog']
+            catalog.format('hint.cooldown', int(state['cooldown']))
+            catalog.format('hud.coins', state['coins'])
+    return setup, tick
+
+
+def suite(quick=False):
+    scale = 0.1 if quick else 1
+    cases = []
+    for bins in (100, 1000, 10000, 50000):
+        cases.append((f'world_size/bins={bins}', world_size(bins, max(6, bins // 50))))
+    for n in (10, 100, 1000):
+        cases.append((f'concurrent_searches/{n}', concurrent_searches(n)))
+    for n in (100, 1000, 10000):
+        cases.append((f'scavenger_crowd/{n}', scavenger_crowd(n)))
+    for n in (10, 1000, 10000):
+        cases.append((f'vendor_market/{n}', vendor_market(n)))
+    for n in (100, 10000, 100000):
+        cases.append((f'inventory_size/{n}', inventory_size(n)))
+    for kind in ('latin', 'arabic', 'arabic_uncached'):
+        cases.append((f'text_path/{kind}', text_path(kind)))
+    return cases, max(60, int(3000 * scale))
+
+
+# ----- Runner -----
+def measure(setup, tick, ticks):
+    state = setup()
+    times = []
+    clock = time.perf_counter
+    start = clock()
+    for n in range(ticks):
+        t0 = clock()
+        tick(state, n)
+        times.append(clock() - t0)
+    elapsed = clock() - start
+
+    # separate, shorter pass: tracemalloc slows everything it watches
+    tracemalloc.start()
+    state = setup()
+    for n in range(max(1, ticks // 10)):
+        tick(state, n)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    times.sort()
+    last = len(times) - 1
+    pct = lambda p: times[round(p / 100 * last)] * 1000
+    return {
+        'ticks': ticks,
+        'ticks_per_sec': ticks / elapsed,
+        'p50_ms': pct(50), 'p95_ms': pct(95), 'p99_ms': pct(99),
+        'peak_kb': peak / 1024,
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, r in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        change = (r['ticks_per_sec'] - old['ticks_per_sec']) / old['ticks_per_sec'] * 100
+        flag = ''
+        if change < -tolerance:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f'  {name:<36}{change:+7.1f}% ticks/s{flag}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless Miser 2D benchmarks')
+    parser.add_argument('--quick', action='store_true', help='fewer ticks per case')
+    parser.add_argument('--only', help='run cases whose name contains this')
+    parser.add_argument('--out', help='write results JSON here')
+    parser.add_argument('--baseline', help='compare against a previous results JSON')
+    parser.add_argument('--tolerance', type=float, default=10, help='allowed ticks/s drop in percent')
+    args = parser.parse_args(argv)
+
+    cases, ticks = suite(args.quick)
+    results = {}
+    for name, (setup, tick) in cases:
+        if args.only and args.only not in name:
+            continue
+        try:
+            r = measure(setup, tick, ticks)
+        except ImportError as e:
+            print(f'{name:<36} skipped ({e.name} not installed)')
+            continue
+        results[name] = r
+        print(f"{name:<36}{r['ticks_per_sec']:>12.0f} ticks/s  p50 {r['p50_ms']:.3f}  "
+              f"p95 {r['p95_ms']:.3f}  p99 {r['p99_ms']:.3f} ms  peak {r['peak_kb']:.0f} KB")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                       'quick': args.quick, 'results': results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        print(f'vs {args.baseline}:')
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
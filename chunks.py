@@ -0,0 +1,125 @@
+# Miser 2D - Procedural chunk streaming
+# The city is an endless grid of square chunks, each generated from
+# (seed, cx, cy). Only chunks around an anchor (the simulated player, after
+# every fixed step) are loaded into the World; distant chunks are dropped
+# and only their bins' cooldowns are kept, so memory and per-frame cost stay
+# flat however far the player walks.
+
+import math, random
+from array import array
+from miser_core import World, VENDORS
+
+CHUNK_SIZE = 16
+LOAD_RADIUS = 1     # chunks loaded around the anchor (1 -> 3x3)
+UNLOAD_RADIUS = 2   # hysteresis so walking along a border doesn't thrash
+BINS_PER_CHUNK = (4, 10)
+VENDOR_CHANCE = 0.35
+
+
+class Chunk:
+    def __init__(self, key, bins, vendors):
+        self.key = key
+        self.bins = bins
+        self.vendors = vendors
+
+
+class ChunkManager:
+    def __init__(self, world, seed=None, chunk_size=CHUNK_SIZE, load_radius=LOAD_RADIUS, unload_radius=UNLOAD_RADIUS):
+        self.world = world
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.chunk_size = chunk_size
+        self.load_radius = load_radius
+        self.unload_radius = max(unload_radius, load_radius)
+        self.loaded = {}   # (cx, cy) -> Chunk
+        self.saved = {}    # (cx, cy) -> array('d') of bin ready_at times
+        self.anchor = None
+
+    def chunk_of(self, x, y):
+        # chunk (0, 0) is centered on the origin, where the player spawns
+        half = self.chunk_size / 2
+        return (math.floor((x + half) / self.chunk_size), math.floor((y + half) / self.chunk_size))
+
+    def update(self, x, y):
+        key = self.chunk_of(x, y)
+        if key == self.anchor:
+            return
+        self.anchor = key
+        ax, ay = key
+        for cx in range(ax - self.load_radius, ax + self.load_radius + 1):
+            for cy in range(ay - self.load_radius, ay + self.load_radius + 1):
+                if (cx, cy) not in self.loaded:
+                    self._load((cx, cy))
+        for k in [k for k in self.loaded if max(abs(k[0] - ax), abs(k[1] - ay)) > self.unload_radius]:
+            self._unload(k)
+        self._prune()
+
+    def _load(self, key):
+        world = self.world
+        cx, cy = key
+        rng = random.Random(f'{self.seed}:{cx}:{cy}')
+        size = self.chunk_size
+        ox, oy = cx * size, cy * size
+        bins, vendors = [], []
+
+        if key == (0, 0):
+            # keep the familiar starting street
+            for _ in range(6):
+                bins.append(world.add_bin(rng.uniform(-5, 5), rng.uniform(-3, 3)))
+            for name, accepts, (x, y) in VENDORS:
+                vendors.append(world.add_vendor(name, accepts, x, y))
+        else:
+            half = size / 2 - 1
+            for _ in range(rng.randint(*BINS_PER_CHUNK)):
+                bins.append(world.add_bin(ox + rng.uniform(-half, half), oy + rng.uniform(-half, half)))
+            if rng.random() < VENDOR_CHANCE:
+                name, accepts, _ = rng.choice(VENDORS)
+                vendors.append(world.add_vendor(name, accepts, ox + rng.uniform(-half, half), oy + rng.uniform(-half, half)))
+
+        saved = self.saved.pop(key, None)
+        if saved is not None:
+            for b, ready_at in zip(bins, saved):
+                b.ready_at = ready_at
+        chunk = self.loaded[key] = Chunk(key, bins, vendors)
+        world.events.append(('chunk_loaded', chunk))
+
+    def _unload(self, key):
+        chunk = self.loaded.pop(key)
+        self.world.events.append(('chunk_unloaded', chunk))
+        now = self.world.time
+        if any(b.ready_at > now for b in chunk.bins):
+            self.saved[key] = array('d', (b.ready_at for b in chunk.bins))
+        for obj in chunk.bins + chunk.vendors:
+            self.world.remove(obj)
+
+    def cooldowns(self):
+        # chunk key -> array('d') of bin ready_at times, for every chunk,
+        # loaded or not, with a bin still cooling down
+        now = self.world.time
+        out = {key: ready for key, ready in self.saved.items() if max(ready) > now}
+        for key, chunk in self.loaded.items():
+            if any(b.ready_at > now for b in chunk.bins):
+                out[key] = array('d', (b.ready_at for b in chunk.bins))
+        return out
+
+    def restore_cooldowns(self, cooldowns):
+        # the inverse, e.g. from a save; chunks not loaded get them on load
+        for key, ready in cooldowns.items():
+            chunk = self.loaded.get(key)
+            if chunk is None:
+                self.saved[key] = ready
+            else:
+                for b, ready_at in zip(chunk.bins, ready):
+                    b.ready_at = ready_at
+
+    def _prune(self):
+        # a chunk whose cooldowns have all run out is identical to a fresh one
+        now = self.world.time
+        for key in [k for k, ready in self.saved.items() if max(ready) <= now]:
+            del self.saved[key]
+
+
+def streamed_world(seed=None, **kwargs):
+    world = World(seed=seed, **kwargs)
+    chunks = ChunkManager(world, seed)
+    chunks.update(world.player.x, world.player.y)
+    return world, chunks
@@ -0,0 +1,214 @@
+# Miser 2D - Monte Carlo economy simulator
+# Plays millions of player sessions through the same loot table and sell
+# rules as the game, spread over a process pool, to tune drop rates and
+# prices without playing. Each batch of sessions gets its own child of one
+# SeedSequence, so results depend on --seed and --batch only, never on how
+# many workers ran them.
+#
+#   python economy.py --sessions 1000000 --minutes 30
+#   python economy.py --multiplier epic=4 --cooldown-time 8
+#   python economy.py --scaling
+#   python economy.py --check        # edge cases, asserted
+
+import argparse, contextlib, io, json, math, os, time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from loot import LootTable
+from miser_core import ITEM_TEMPLATES, RARITY_TABLE, RARITY_MULTIPLIERS, SEARCH_TIME, COOLDOWN_TIME, VENDORS
+
+Z95 = 1.959964
+
+
+# ----- Session model -----
+# A player walks a round of `bins` bins: each search takes search_time plus
+# `walk` seconds to reach the next bin, and a bin is only searched again once
+# its cooldown is over. Everything found is sold to whichever vendor accepts
+# its material at base value: a lone player's sales barely move a vendor's
+# market price (see market.py), so this is the top of what a session earns.
+def search_period(search_time, cooldown_time, bins, walk):
+    return max(search_time + walk, (search_time + cooldown_time + walk) / bins)
+
+
+def searches_per_session(seconds, search_time, period):
+    if seconds < search_time:
+        return 0
+    return int((seconds - search_time) // period) + 1
+
+
+def run_batch(job):
+    (seed, sessions, config) = job
+    rng = np.random.default_rng(seed)
+    loot = LootTable(ITEM_TEMPLATES, RARITY_TABLE, config['multipliers'])
+    accepted = {material for _, material, _ in VENDORS}
+    sellable = np.array([item.material in accepted for item in loot.items])
+    epic = loot.rarity_keys.index('epic') if 'epic' in loot.rarity_keys else None
+
+    period = config['period']
+    count = searches_per_session(config['minutes'] * 60, config['search_time'], period)
+    idx = loot.roll(sessions * count, rng).reshape(sessions, count)
+
+    values = loot.values[idx]
+    coins = np.where(sellable[idx], values, 0).sum(axis=1)
+    unsold = values.sum(axis=1) - coins
+    by_rarity = np.bincount(loot.rarity_ids[idx].ravel(), weights=values.ravel(), minlength=len(loot.rarity_keys))
+
+    # time to first Epic keeps rolling past the session end, so it isn't censored;
+    # the first block is the session's own searches, which may be none
+    first_epic = np.full(sessions, np.nan)
+    if epic is not None:
+        rids = loot.rarity_ids[idx] == epic
+        offset = 0
+        todo = np.arange(sessions)
+        block = max(count, 64)
+        while True:
+            hit = rids.any(axis=1)
+            if hit.any():
+                first_epic[todo[hit]] = (offset + rids[hit].argmax(axis=1)) * period + config['search_time']
+            todo = todo[~hit]
+            if not len(todo):
+                break
+            offset += rids.shape[1]
+            rids = loot.rarity_ids[loot.roll(len(todo) * block, rng).reshape(len(todo), block)] == epic
+
+    return coins / config['minutes'], unsold, first_epic, by_rarity, count
+
+
+# ----- Statistics -----
+def mean_ci(x):
+    x = x[~np.isnan(x)]
+    mean = x.mean()
+    half = Z95 * x.std(ddof=1) / math.sqrt(len(x)) if len(x) > 1 else math.nan
+    return mean, mean - half, mean + half
+
+
+def median_ci(x):
+    # distribution-free: order statistics around n/2 (binomial, normal approx.)
+    x = np.sort(x[~np.isnan(x)])
+    n = len(x)
+    half = Z95 * math.sqrt(n) / 2
+    lo, hi = max(0, int(n / 2 - half)), min(n - 1, int(math.ceil(n / 2 + half)))
+    return float(np.median(x)), float(x[lo]), float(x[hi])
+
+
+def simulate(sessions, workers, batch, seed, config):
+    children = np.random.SeedSequence(seed).spawn(math.ceil(sessions / batch))
+    jobs = [(child, min(batch, sessions - i * batch), config) for i, child in enumerate(children)]
+    start = time.perf_counter()
+    if workers == 1:
+        results = list(map(run_batch, jobs))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(run_batch, jobs))
+    elapsed = time.perf_counter() - start
+
+    coins_per_min = np.concatenate([r[0] for r in results])
+    unsold = np.concatenate([r[1] for r in results])
+    first_epic = np.concatenate([r[2] for r in results])
+    by_rarity = sum(r[3] for r in results)
+    names = [name for name, _ in RARITY_TABLE]
+    total = by_rarity.sum()
+    pcts = (1, 5, 25, 50, 75, 95, 99)
+    return {
+        'sessions': sessions,
+        'searches_per_session': results[0][4],
+        'seconds': elapsed,
+        'sessions_per_sec': sessions / elapsed,
+        'coins_per_min': dict(zip(('mean', 'ci_low', 'ci_high'), mean_ci(coins_per_min))),
+        'session_coins_percentiles': {f'p{p}': float(v) for p, v in zip(pcts, np.percentile(coins_per_min * config['minutes'], pcts))},
+        'value_share_by_rarity': {name: float(v / total) for name, v in zip(names, by_rarity)},
+        'unsold_per_session': float(unsold.mean()),
+        'first_epic_seconds': {
+            **dict(zip(('mean', 'ci_low', 'ci_high'), mean_ci(first_epic))),
+            **dict(zip(('median', 'median_ci_low', 'median_ci_high'), median_ci(first_epic))),
+        },
+    }
+
+
+def report(r):
+    c, e = r['coins_per_min'], r['first_epic_seconds']
+    print(f"{r['sessions']} sessions x {r['searches_per_session']} searches in {r['seconds']:.2f}s "
+          f"({r['sessions_per_sec']:.0f} sessions/s)")
+    print(f"coins/min        {c['mean']:.3f}  95% CI [{c['ci_low']:.3f}, {c['ci_high']:.3f}]")
+    print('session coins    ' + '  '.join(f'{k} {v:.0f}' for k, v in r['session_coins_percentiles'].items()))
+    print('value by rarity  ' + '  '.join(f'{k} {v:.1%}' for k, v in r['value_share_by_rarity'].items()))
+    if r['unsold_per_session']:
+        print(f"unsold value     {r['unsold_per_session']:.1f} per session (no vendor buys it)")
+    print(f"first Epic       mean {e['mean']:.1f}s  95% CI [{e['ci_low']:.1f}, {e['ci_high']:.1f}]  "
+          f"median {e['median']:.1f}s [{e['median_ci_low']:.1f}, {e['median_ci_high']:.1f}]")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Monte Carlo economy simulator for Miser 2D')
+    parser.add_argument('--sessions', type=int, default=1_000_000)
+    parser.add_argument('--minutes', type=float, default=30, help='length of one play session')
+    parser.add_argument('--bins', type=int, default=6, help='bins in the player\'s round')
+    parser.add_argument('--walk', type=float, default=1.0, help='seconds from one bin to the next')
+    parser.add_argument('--search-time', type=float, default=SEARCH_TIME)
+    parser.add_argument('--cooldown-time', type=float, default=COOLDOWN_TIME)
+    parser.add_argument('--multiplier', action='append', default=[], metavar='RARITY=X',
+                        help='override a rarity multiplier (repeatable)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--batch', type=int, default=10_000, help='sessions per task')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the results here')
+    parser.add_argument('--scaling', action='store_true', help='time the same run on 1, 2, 4 ... workers')
+    parser.add_argument('--check', action='store_true', help='assert the edge cases and exit')
+    args = parser.parse_args(argv)
+    if args.check:
+        check()
+        return
+
+    multipliers = dict(RARITY_MULTIPLIERS)
+    for override in args.multiplier:
+        rarity, _, value = override.partition('=')
+        if rarity not in multipliers:
+            parser.error(f'unknown rarity {rarity!r}')
+        multipliers[rarity] = float(value)
+    config = {
+        'minutes': args.minutes,
+        'search_time': args.search_time,
+        'period': search_period(args.search_time, args.cooldown_time, args.bins, args.walk),
+        'multipliers': multipliers,
+    }
+    if searches_per_session(args.minutes * 60, args.search_time, config['period']) == 0:
+        parser.error(f'--minutes {args.minutes:g} is too short for one {args.search_time:g}s search')
+
+    if args.scaling:
+        counts = [1 << i for i in range(int(math.log2(args.workers)) + 1)]
+        if counts[-1] != args.workers:
+            counts.append(args.workers)
+        base = None
+        for workers in counts:
+            r = simulate(args.sessions, workers, args.batch, args.seed, config)
+            base = base or r['seconds']
+            print(f"{workers:>3} workers  {r['seconds']:7.2f}s  speedup {base / r['seconds']:5.2f}x  "
+                  f"efficiency {base / r['seconds'] / workers:.0%}")
+        return
+
+    r = simulate(args.sessions, args.workers, args.batch, args.seed, config)
+    report(r)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': {**vars(args), 'multipliers': multipliers}, 'results': r}, f, indent=2)
+
+
+def check():
+    # a session too short for one search earns nothing, yet still finds a
+    # first Epic; the command line refuses such sessions outright
+    config = {'minutes': 0.05, 'search_time': SEARCH_TIME, 'multipliers': dict(RARITY_MULTIPLIERS),
+              'period': search_period(SEARCH_TIME, COOLDOWN_TIME, 6, 1.0)}
+    coins, unsold, first_epic, _, count = run_batch((np.random.SeedSequence(0), 2000, config))
+    assert count == 0 and not coins.any() and not unsold.any(), count
+    assert np.isfinite(first_epic).all() and (first_epic >= SEARCH_TIME).all()
+    try:
+        with contextlib.redirect_stderr(io.StringIO()):
+            main(['--minutes', '0.05', '--workers', '1'])
+    except SystemExit as e:
+        assert e.code == 2, e.code
+    else:
+        raise AssertionError('--minutes 0.05 was accepted')
+    print('economy checks passed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# Miser 2D - Fixed-timestep simulation loop
+# Rendered frames pour real time into an accumulator and the World only ever
+# steps by STEP, so the rules play out the same at 30, 144 or 5 fps. The
+# player is drawn between its last two simulated positions. time_scale runs
+# many steps per frame (fast-forward, soak tests) or, paused, none at all.
+# While a pilot (nav.Autopilot) is active it supplies each step's input.
+
+import os
+
+STEP = 1 / 60
+MAX_FRAME = 0.25      # a longer hitch is clamped instead of replayed step by step
+MAX_TIME_SCALE = 64
+
+
+class FixedStep:
+    # on_step runs after every world step (e.g. chunk streaming), recorder
+    # sees every step's input (replay.Recorder)
+    def __init__(self, world, step=STEP, time_scale=None, max_frame=MAX_FRAME, on_step=None, recorder=None, pilot=None):
+        self.world = world
+        self.step = step
+        self.on_step = on_step
+        self.recorder = recorder
+        self.pilot = pilot
+        if time_scale is None:
+            time_scale = float(os.environ.get('MISER_TIME_SCALE', 1))
+        self.time_scale = time_scale
+        self.max_frame = max_frame
+        self.paused = False
+        self.accumulator = 0.0
+        self.keys = []
+        self.steps = 0
+        self.previous = (world.player.x, world.player.y)
+
+    def press(self, key):
+        # kept until the next step, so a key pressed while paused isn't lost
+        self.keys.append(key)
+
+    def advance(self, dt, move=(0, 0)):
+        if not self.paused:
+            self.accumulator += min(dt, self.max_frame) * self.time_scale
+        steps = 0
+        while self.accumulator >= self.step:
+            keys, self.keys = self.keys, []
+            step_move = move
+            if self.pilot is not None and self.pilot.active:
+                step_move, pressed = self.pilot.steer(self.step)
+                keys.extend(pressed)
+            self.tick(step_move, keys)
+            self.accumulator -= self.step
+            steps += 1
+        return steps
+
+    def tick(self, move, keys=()):
+        # exactly one step; replays call this directly
+        world = self.world
+        p = world.player
+        self.previous = (p.x, p.y)
+        if self.recorder is not None:
+            self.recorder.record(move, keys)
+        world.step(self.step, {'move': move, 'keys': keys})
+        if self.on_step is not None:
+            self.on_step()
+        if self.recorder is not None:
+            self.recorder.stepped(world)
+        self.steps += 1
+
+    # ----- Render side -----
+    @property
+    def alpha(self):
+        # how far the next step has come, 0..1
+        return self.accumulator / self.step
+
+    def player_position(self):
+        px, py = self.previous
+        p = self.world.player
+        a = self.alpha
+        return (px + (p.x - px) * a, py + (p.y - py) * a)
+
+    # ----- Speed -----
+    def faster(self):
+        self.time_scale = min(MAX_TIME_SCALE, self.time_scale * 2)
+        return self.time_scale
+
+    def slower(self):
+        self.time_scale = max(1 / MAX_TIME_SCALE, self.time_scale / 2)
+        return self.time_scale
+
+    def toggle_pause(self):
+        self.paused = not self.paused
+        return self.paused
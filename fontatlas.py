@@ -0,0 +1,191 @@
+# Miser 2D - Distance-field glyph atlases
+# A dynamic font rasterizes each glyph the first time a string needs it, at
+# a size tied to its pixels-per-unit, so new text can hitch and big labels
+# need big glyph pages (and every new ursina Text clears the shared font and
+# starts over). Instead, every glyph a language can show - each character
+# of its compiled catalog, Arabic contextual forms included, plus ASCII for
+# numbers and paths - is rendered once as a signed distance field into one
+# small atlas and saved as a static font in the asset cache, keyed by a hash
+# of the font file and the glyph set. A distance field stays sharp at any
+# scale: a tiny shader cuts it at the glyph edge, or without shaders an
+# alpha test does.
+#
+#   python fontatlas.py      # build every language's atlas into the cache
+
+import builtins, hashlib, os, string
+from pathlib import Path
+from panda3d.core import (CS_zup_right, DynamicTextFont, Filename, Geom, GeomNode, GeomPoints, GeomVertexData,
+                          GeomVertexFormat, GeomVertexWriter, Loader, LoaderOptions, NodePath, PandaNode, Shader,
+                          StaticTextFont, TextFont, TransparencyAttrib, VirtualFileSystem)
+from assets import CACHE_DIR
+from i18n import SLOT, MAX_SLOTS
+
+FORMAT = 1
+PIXELS_PER_UNIT = 32      # of the distance field, not of the text on screen
+PAGE_SIZE = 512           # grown until every glyph fits on one page
+ALWAYS = string.digits + string.ascii_letters + string.punctuation + ' ×'
+
+_VERTEX = '''#version 120
+uniform mat4 p3d_ModelViewProjectionMatrix;
+attribute vec4 p3d_Vertex;
+attribute vec2 p3d_MultiTexCoord0;
+attribute vec4 p3d_Color;
+varying vec2 uv;
+varying vec4 tint;
+void main() {
+    gl_Position = p3d_ModelViewProjectionMatrix * p3d_Vertex;
+    uv = p3d_MultiTexCoord0;
+    tint = p3d_Color;
+}
+'''
+
+_FRAGMENT = '''#version 120
+uniform sampler2D p3d_Texture0;
+uniform vec4 p3d_ColorScale;
+varying vec2 uv;
+varying vec4 tint;
+void main() {
+    // distance 0.5 is the glyph edge; fwidth keeps it one pixel soft at any scale
+    float d = texture2D(p3d_Texture0, uv).a;
+    float w = max(fwidth(d), 1e-4) * 0.7;
+    gl_FragColor = vec4(tint.rgb, tint.a * smoothstep(0.5 - w, 0.5 + w, d)) * p3d_ColorScale;
+}
+'''
+
+_loaded = {}   # (font path, glyphs) -> StaticTextFont
+_shader = None
+
+
+def glyphs(catalog):
+    # every character the catalog's text can put on screen; the slot markers
+    # never are, format() replaces them
+    chars = set(''.join(catalog[key] for key in catalog.keys()))
+    chars -= {chr(SLOT + i) for i in range(MAX_SLOTS)}
+    return ''.join(sorted(chars | set(ALWAYS)))
+
+
+def find_font(name, folder):
+    # a Panda Filename for a font in the (possibly packed) asset folder or
+    # among ursina's own fonts
+    vfs = VirtualFileSystem.getGlobalPtr()
+    for base in (Path(folder), Path(__file__).resolve().parent):
+        path = Filename.fromOsSpecific(str((base / name).resolve()))
+        if vfs.exists(path):
+            return path
+    from ursina import application
+    path = Filename.fromOsSpecific(str(Path(application.internal_fonts_folder) / name))
+    return path if vfs.exists(path) else None
+
+
+def load(name, chars, folder, cache_dir=CACHE_DIR):
+    # the atlas font for `chars` of font `name`, from the cache or built now
+    path = find_font(name, folder)
+    if path is None:
+        raise FileNotFoundError(f'font {name} not found')
+    font = _loaded.get((path.getFullpath(), chars))
+    if font is not None:
+        return font
+    data = VirtualFileSystem.getGlobalPtr().readFile(path, True)
+    key = hashlib.sha1(b'%d:%d:' % (FORMAT, PIXELS_PER_UNIT) + data + chars.encode()).hexdigest()[:16]
+    cached = Path(cache_dir) / f'{Path(name).stem}-{key}.bam'
+    root = None
+    if cached.is_file():
+        root = Loader.getGlobalPtr().loadSync(Filename.fromOsSpecific(str(cached)),
+                                              LoaderOptions(LoaderOptions.LF_no_cache))
+    if root is None:
+        root = build(path, chars)
+        try:
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cached.with_name(f'{cached.stem}.{os.getpid()}.tmp.bam')
+            NodePath(root).writeBamFile(Filename.fromOsSpecific(str(tmp)))
+            os.replace(tmp, cached)
+        except OSError:
+            pass   # read-only home: build again next launch
+    # glyphs are modelled z-up whatever coordinate system the game runs in
+    font = StaticTextFont(root, CS_zup_right)
+    _loaded[(path.getFullpath(), chars)] = font
+    return font
+
+
+def build(path, chars):
+    # a static font model (one node per glyph, named by its code point,
+    # the way egg-mkfont writes them) over one distance-field page
+    size = PAGE_SIZE
+    while True:
+        source = DynamicTextFont(path)
+        source.setRenderMode(TextFont.RM_distance_field)
+        source.setPixelsPerUnit(PIXELS_PER_UNIT)
+        source.setPageSize(size, size)
+        found = [(ch, source.getGlyph(ord(ch))) for ch in chars]
+        if source.getNumPages() <= 1:
+            break
+        size *= 2
+    root = PandaNode(Path(path.getBasename()).stem)
+    for ch, glyph in found:
+        if glyph is None:
+            continue
+        node = GeomNode(str(ord(ch)))
+        geom = glyph.getGeom(Geom.UHStatic)
+        if geom is not None:
+            node.addGeom(geom, glyph.getState())
+        node.addGeom(_dot(glyph.getAdvance(), 0))   # the advance
+        root.addChild(node)
+    ds = GeomNode('ds')
+    ds.addGeom(_dot(0, source.getLineHeight()))      # the line height
+    root.addChild(ds)
+    return root
+
+
+def _dot(x, z):
+    vdata = GeomVertexData('dot', GeomVertexFormat.getV3(), Geom.UHStatic)
+    GeomVertexWriter(vdata, 'vertex').addData3(x, 0, z)
+    points = GeomPoints(Geom.UHStatic)
+    points.addVertex(0)
+    geom = Geom(vdata)
+    geom.addPrimitive(points)
+    return geom
+
+
+# ----- Rendering -----
+def distance_field(np):
+    # render glyphs under np from their distance field
+    global _shader
+    gsg = builtins.base.win.getGsg()
+    if gsg and gsg.getSupportsBasicShaders():
+        if _shader is None:
+            _shader = Shader.make(Shader.SL_GLSL, _VERTEX, _FRAGMENT)
+        np.setShader(_shader, 1)
+        np.setTransparency(TransparencyAttrib.MAlpha, 1)
+    else:
+        # alpha test at the edge: aliased, but still sharp at any scale
+        np.setTransparency(TransparencyAttrib.MBinary, 1)
+
+
+def apply(text, font):
+    # an ursina Text onto an atlas font. Its font setter only takes a font
+    # file and resizes it as a dynamic font, so the atlas goes in through
+    # Text._font, which every new text section reads; an ursina without it
+    # gets the font on the text nodes it has
+    if hasattr(text, '_font'):
+        text._font = font
+    else:
+        for node in text.findAllMatches('**/+TextNode'):
+            node.node().setFont(font)
+    distance_field(text)
+    if text.text:
+        text.text = text.raw_text
+
+
+if __name__ == '__main__':
+    import time
+    import i18n
+    from panda3d.core import loadPrcFileData
+    loadPrcFileData('', 'window-type none')
+    from ursina import Text
+    for lang in i18n.languages():
+        catalog = i18n.load(lang)
+        chars = glyphs(catalog)
+        start = time.perf_counter()
+        load(catalog.font or Text.default_font, chars, '.')
+        print(f'{lang}: {len(chars)} glyphs of {catalog.font or Text.default_font} '
+              f'in {(time.perf_counter() - start) * 1000:.0f} ms')
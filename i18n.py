@@ -0,0 +1,202 @@
+# Miser 2D - Locale catalogs
+# Everything the player reads lives in locales/<lang>.json under a stable
+# key; the game itself only handles ids ('paper', 'tailor', 'epic') and asks
+# the current catalog how to show them. Sources are compiled ahead of time
+# into a small binary catalog: right-to-left text is already reshaped and in
+# visual order, and templates keep numbered slots that format() fills with
+# no shaping at all, so arabic_reshaper and bidi are only needed to compile.
+# A language's file is read the first time it is used and each string is
+# decoded on its first lookup.
+#
+#   python i18n.py              # compile every locales/*.json
+#   MISER_LANG=ar python testursina.py
+
+import json, os, string, struct, sys
+from pathlib import Path
+
+MAGIC = b'MSRCAT01'
+_HEADER = struct.Struct('<8sBxHI')   # magic, flags, entry count, text block size
+_ENTRY = struct.Struct('<IHIH')      # key offset, key size, text offset, text size (into the text block)
+RTL = 1
+SLOT = 0xFF10     # fullwidth digits mark template slots: same bidi class as real digits
+MAX_SLOTS = 10
+DEFAULT_LANG = 'en'
+# frozen builds unpack the compiled catalogs next to the bundled assets
+LOCALE_DIR = Path(getattr(sys, '_MEIPASS', Path(__file__).resolve().parent)) / 'locales'
+
+
+def current_language():
+    return os.environ.get('MISER_LANG', DEFAULT_LANG)
+
+
+# ----- Compiling -----
+def _slotted(text):
+    # '{} x{}' or '{1} ... {0}' -> a slot marker where each field was
+    out, auto = [], 0
+    for literal, field, _, _ in string.Formatter().parse(text):
+        out.append(literal)
+        if field is None:
+            continue
+        if field:
+            index = int(field)
+        else:
+            index, auto = auto, auto + 1
+        if index >= MAX_SLOTS:
+            raise ValueError(f'{text!r}: at most {MAX_SLOTS} fields')
+        out.append(chr(SLOT + index))
+    return ''.join(out)
+
+
+def compile_catalog(source, target):
+    with open(source, encoding='utf-8') as f:
+        data = json.load(f)
+    meta, strings = data['meta'], data['strings']
+    rtl = bool(meta.get('rtl'))
+    if rtl:
+        from shaping import shape   # only the compiler needs the shaping libraries
+    entries = {f'meta.{key}': str(value) for key, value in meta.items() if key != 'rtl'}
+    for key, text in strings.items():
+        text = _slotted(text)
+        # the whole UI reads right to left, even a string that opens with '[E]'
+        entries[key] = shape(text, 'R') if rtl else text
+
+    index, block = bytearray(), bytearray()
+    for key in sorted(entries):
+        k, t = key.encode(), entries[key].encode()
+        index += _ENTRY.pack(len(block), len(k), len(block) + len(k), len(t))
+        block += k + t
+    target = Path(target)
+    partial = target.with_suffix('.tmp')
+    with open(partial, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, RTL if rtl else 0, len(entries), len(block)))
+        f.write(index)
+        f.write(block)
+    os.replace(partial, target)
+    return len(entries)
+
+
+def build(folder=LOCALE_DIR):
+    # compile every source in folder, after checking each covers the
+    # default language's keys; the spec files call this before bundling
+    folder = Path(folder)
+    sources = sorted(folder.glob('*.json'))
+    keys = {}
+    for source in sources:
+        with open(source, encoding='utf-8') as f:
+            keys[source.stem] = set(json.load(f)['strings'])
+    reference = keys.get(DEFAULT_LANG, set())
+    for lang, have in keys.items():
+        missing = reference - have
+        if missing:
+            raise ValueError(f'{lang}: missing {", ".join(sorted(missing))}')
+    return {source.stem: compile_catalog(source, source.with_suffix('.mcat')) for source in sources}
+
+
+# ----- Loading -----
+class Catalog:
+    def __init__(self, lang, data):
+        magic, flags, count, _ = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{lang}: not a Miser 2D catalog from this version')
+        self.lang = lang
+        self.rtl = bool(flags & RTL)
+        self.data = data
+        block = _HEADER.size + count * _ENTRY.size
+        self.index = {}       # key -> (offset, size) of its text
+        for key_at, key_size, text_at, text_size in _ENTRY.iter_unpack(data[_HEADER.size:block]):
+            key = data[block + key_at:block + key_at + key_size].decode()
+            self.index[key] = (block + text_at, text_size)
+        self.texts = {}       # key -> decoded text
+        self.templates = {}   # key -> (pieces, slot order)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def keys(self):
+        return self.index.keys()
+
+    def __getitem__(self, key):
+        text = self.texts.get(key)
+        if text is None:
+            at, size = self.index[key]
+            text = self.texts[key] = self.data[at:at + size].decode()
+        return text
+
+    def get(self, key, default=''):
+        return self[key] if key in self.index else default
+
+    @property
+    def name(self):
+        return self.get('meta.name', self.lang)
+
+    @property
+    def title(self):
+        return self.get('meta.title')
+
+    @property
+    def font(self):
+        # None: the engine's default font
+        return self.get('meta.font') or None
+
+    def format(self, key, *values):
+        # values are numbers or text from this catalog; right-to-left they
+        # drop into the slots' places in the already ordered template
+        template = self.templates.get(key)
+        if template is None:
+            template = self.templates[key] = _split(self[key])
+        pieces, order = template
+        out = pieces[0]
+        for slot, piece in zip(order, pieces[1:]):
+            out += str(values[slot]) + piece
+        return out
+
+    def join(self, items):
+        # a list of display texts; right-to-left the first one is rightmost
+        if self.rtl:
+            items = reversed(items)
+        return self['list.separator'].join(items)
+
+
+def _split(text):
+    pieces, order, piece = [], [], ''
+    for ch in text:
+        slot = ord(ch) - SLOT
+        if 0 <= slot < MAX_SLOTS:
+            pieces.append(piece)
+            order.append(slot)
+            piece = ''
+        else:
+            piece += ch
+    pieces.append(piece)
+    return pieces, order
+
+
+_loaded = {}   # (lang, folder) -> Catalog
+
+
+def load(lang, folder=LOCALE_DIR):
+    # a language's catalog, read once; recompiled first when a source is
+    # newer than its build (a checkout has no compiled catalogs yet)
+    folder = Path(folder)
+    catalog = _loaded.get((lang, folder))
+    if catalog is None:
+        source, target = folder / f'{lang}.json', folder / f'{lang}.mcat'
+        if source.exists() and (not target.exists() or target.stat().st_mtime < source.stat().st_mtime):
+            compile_catalog(source, target)
+        catalog = _loaded[(lang, folder)] = Catalog(lang, target.read_bytes())
+    return catalog
+
+
+def languages(folder=LOCALE_DIR):
+    folder = Path(folder)
+    return sorted({p.stem for p in folder.glob('*.json')} | {p.stem for p in folder.glob('*.mcat')})
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Compile the Miser 2D locale catalogs')
+    parser.add_argument('folder', nargs='?', default=LOCALE_DIR)
+    args = parser.parse_args()
+    for lang, count in build(args.folder).items():
+        size = (Path(args.folder) / f'{lang}.mcat').stat().st_size
+        print(f'{lang}: {count} strings, {size} bytes')
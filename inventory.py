@@ -0,0 +1,91 @@
+# Miser 2D - Material-indexed inventory
+# Items are bucketed by material with running counts and values, so selling
+# to a vendor drops one bucket in O(1) and the HUD reads a handful of
+# aggregated counts instead of re-stringifying every item. A bucket is an
+# array of 2-byte template ids into the loot table's shared ItemTemplates,
+# not a list of item objects.
+
+from array import array
+from collections import Counter
+
+
+class Inventory:
+    def __init__(self):
+        self.buckets = {}      # material -> array('H') of template ids
+        self.values = {}       # material -> summed value
+        self.id_counts = {}    # material -> {template id: count}
+        self.templates = {}    # template id -> ItemTemplate, for ids seen so far
+        self.count = 0
+        self.total_value = 0
+        self.version = 0       # bumped on every change, for lazy HUD refresh
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        templates = self.templates
+        for bucket in self.buckets.values():
+            for i in bucket:
+                yield templates[i]
+
+    def add(self, item):
+        material = item.material
+        bucket = self.buckets.get(material)
+        if bucket is None:
+            bucket = self.buckets[material] = array('H')
+            self.values[material] = 0
+            self.id_counts[material] = {}
+        bucket.append(item.id)
+        self.templates[item.id] = item
+        self.values[material] += item.value
+        ids = self.id_counts[material]
+        ids[item.id] = ids.get(item.id, 0) + 1
+        self.count += 1
+        self.total_value += item.value
+        self.version += 1
+
+    def count_of(self, material):
+        bucket = self.buckets.get(material)
+        return len(bucket) if bucket else 0
+
+    def value_of(self, material):
+        return self.values.get(material, 0)
+
+    def take(self, material):
+        # remove a whole material bucket; returns (template ids, total value)
+        bucket = self.buckets.pop(material, None)
+        if not bucket:
+            return array('H'), 0
+        value = self.values.pop(material)
+        del self.id_counts[material]
+        self.count -= len(bucket)
+        self.total_value -= value
+        self.version += 1
+        return bucket, value
+
+    def restore(self, material, ids, items):
+        # put back a saved bucket (see savegame.py) in one go; ids index
+        # `items`, the loot table's ItemTemplates
+        self.take(material)
+        if not ids:
+            return
+        bucket = self.buckets[material] = array('H', ids)
+        counts = self.id_counts[material] = dict(Counter(bucket))
+        value = 0
+        for i, n in counts.items():
+            self.templates[i] = items[i]
+            value += items[i].value * n
+        self.values[material] = value
+        self.count += len(bucket)
+        self.total_value += value
+        self.version += 1
+
+    def summary(self):
+        # [(item key, count), ...] in first-found order
+        merged = {}
+        templates = self.templates
+        for ids in self.id_counts.values():
+            for i, n in ids.items():
+                key = templates[i].key
+                merged[key] = merged.get(key, 0) + n
+        return list(merged.items())
@@ -0,0 +1,182 @@
+# Miser 2D - Vendor market
+# A vendor's price for its material sags as it buys and recovers toward the
+# base value over time, so no single stall can be farmed. Each vendor has a
+# supply level (base value it bought recently) and a demand depth; the price
+# multiplier is exp(-supply / depth). Selling base value V at once pays
+#   depth * exp(-supply / depth) * (1 - exp(-V / depth))
+# which is what selling it one coin at a time would pay, in any order, with
+# no loop. Supply decays exponentially, so nothing has to run per tick:
+# each row keeps the world time its supply was last brought up to date and
+# is decayed in closed form when it is next read. A vendor that streams out
+# leaves its supply behind and finds it (decayed) when it streams back in.
+
+import math
+import numpy as np
+
+DEPTH = 2000         # base value sold at once that cuts a vendor's price to 1/e
+RECOVERY = 90        # seconds for a vendor's supply to fall to 1/e
+FORGET = 1           # supply below which a vendor is as good as new
+CAPACITY = 64
+
+
+class Market:
+    def __init__(self, depth=DEPTH, recovery=RECOVERY, capacity=CAPACITY):
+        self.depth = depth
+        self.recovery = recovery
+        self.supply = np.zeros(capacity)
+        self.stamp = np.zeros(capacity)                 # world time each row's supply is as of
+        self.demand = np.full(capacity, float(depth))   # depth per vendor row
+        self.free = list(range(capacity - 1, -1, -1))
+        self.places = {}   # row of an open vendor -> its (key, x, y)
+        self.left = {}     # (key, x, y) -> (supply, time) of vendors that were removed
+
+    # ----- Vendors -----
+    def open(self, vendor, now, depth=None):
+        # give a vendor a row; it is vendor.slot until close()
+        if not self.free:
+            self._grow()
+        slot = vendor.slot = self.free.pop()
+        place = self.places[slot] = (vendor.key, vendor.x, vendor.y)
+        self.demand[slot] = depth or self.depth
+        self.supply[slot], self.stamp[slot] = self.left.pop(place, (0.0, now))
+
+    def close(self, vendor, now):
+        slot = vendor.slot
+        supply = self._level(slot, now)
+        if supply > FORGET:
+            self._carry(self.left, self.places[slot], supply, now)
+        del self.places[slot]
+        self.supply[slot] = 0.0
+        self.free.append(slot)
+        vendor.slot = None
+        self._prune(now)
+
+    def _grow(self):
+        size = len(self.supply)
+        self.supply = np.concatenate([self.supply, np.zeros(size)])
+        self.stamp = np.concatenate([self.stamp, np.zeros(size)])
+        self.demand = np.concatenate([self.demand, np.full(size, float(self.depth))])
+        self.free.extend(range(2 * size - 1, size - 1, -1))
+
+    def _carry(self, left, place, supply, time):
+        # add supply as of `time` to left[place]; vendors that share a place
+        # (same key, same spot) carry one level over between them
+        if place in left:
+            other, since = left[place]
+            if since > time:
+                supply, time, other, since = other, since, supply, time
+            supply += other * math.exp((since - time) / self.recovery)
+        left[place] = (supply, time)
+
+    def _prune(self, now):
+        # forget left vendors whose prices have recovered anyway
+        for place in [p for p, (s, t) in self.left.items() if s * math.exp((t - now) / self.recovery) <= FORGET]:
+            del self.left[place]
+
+    # ----- Saving -----
+    def levels(self):
+        # (key, x, y, supply, time) for every place whose vendors, open or
+        # left, have not fully recovered as of `time`
+        out = dict(self.left)
+        for slot, place in self.places.items():
+            if self.supply[slot] > FORGET:
+                self._carry(out, place, float(self.supply[slot]), float(self.stamp[slot]))
+        return [(*place, supply, time) for place, (supply, time) in out.items()]
+
+    def restore(self, levels):
+        # the inverse, onto the same world time: an open vendor at the place
+        # takes its level, others get theirs on open()
+        rows = {}
+        for slot, place in sorted(self.places.items()):
+            rows.setdefault(place, slot)
+        for key, x, y, supply, time in levels:
+            slot = rows.get((key, x, y))
+            if slot is None:
+                self.left[(key, x, y)] = (supply, time)
+            else:
+                self.supply[slot], self.stamp[slot] = supply, time
+
+    # ----- Prices -----
+    def _level(self, slot, now):
+        return float(self.supply[slot]) * math.exp((self.stamp[slot] - now) / self.recovery)
+
+    def price(self, vendor, now):
+        # multiplier on base value for the next coin's worth sold here
+        return math.exp(-self._level(vendor.slot, now) / self.demand[vendor.slot])
+
+    def sell(self, vendor, value, now):
+        # coins paid for base value `value` sold at once
+        if value <= 0:
+            return 0
+        slot = vendor.slot
+        depth = self.demand[slot]
+        supply = self._level(slot, now)
+        paid = depth * math.exp(-supply / depth) * -math.expm1(-value / depth)
+        self.supply[slot] = supply + value
+        self.stamp[slot] = now
+        return round(paid)
+
+    def sell_many(self, slots, values, now):
+        # many sales in one go, vendor rows may repeat: each sale is priced
+        # after the ones before it in the batch. int64 coins per sale.
+        slots = np.asarray(slots, np.intp)
+        values = np.asarray(values, np.float64)
+        if not len(slots):
+            return np.zeros(0, np.int64)
+        order = np.argsort(slots, kind='stable')
+        s, v = slots[order], values[order]
+        sold_before = np.cumsum(v) - v
+        starts = np.flatnonzero(np.r_[True, s[1:] != s[:-1]])
+        sold_before -= np.repeat(sold_before[starts], np.diff(np.r_[starts, len(s)]))
+        depth = self.demand[s]
+        supply = self.supply[s] * np.exp((self.stamp[s] - now) / self.recovery)
+        paid = np.empty(len(s))
+        paid[order] = depth * np.exp(-(supply + sold_before) / depth) * -np.expm1(-v / depth)
+        # bring the rows up to date, then add what they bought
+        self.supply[s] = supply
+        self.stamp[s] = now
+        np.add.at(self.supply, s, v)
+        return np.rint(paid).astype(np.int64)
+
+
+if __name__ == '__main__':
+    # time the market on a large city: batches of sales land on random
+    # vendors while their prices recover
+    import argparse, time
+    parser = argparse.ArgumentParser(description='Time the vendor market')
+    parser.add_argument('--vendors', type=int, default=10000)
+    parser.add_argument('--sales', type=int, default=5000, help='sales per tick')
+    parser.add_argument('--ticks', type=int, default=600)
+    args = parser.parse_args()
+
+    class _Stall:
+        def __init__(self, i):
+            self.key, self.x, self.y, self.slot = 'stall', i, 0, None
+
+    market = Market()
+    stalls = [_Stall(i) for i in range(args.vendors)]
+    for s in stalls:
+        market.open(s, 0.0)
+    rng = np.random.default_rng(0)
+    slots = np.array([s.slot for s in stalls])
+    dt = 1 / 60
+    times = []
+    for tick in range(args.ticks):
+        start = time.perf_counter()
+        market.sell_many(slots[rng.integers(len(slots), size=args.sales)], rng.integers(6, 51, args.sales), tick * dt)
+        times.append(time.perf_counter() - start)
+    now = args.ticks * dt
+    # the closed form agrees with selling one coin at a time
+    bulk, coinwise = _Stall(-1), _Stall(-2)
+    market.open(bulk, now)
+    market.open(coinwise, now)
+    paid = market.sell(bulk, 1000, now)
+    total = 0.0
+    for _ in range(1000):
+        total += market.price(coinwise, now)
+        market.sell(coinwise, 1, now)
+    assert abs(paid - total) / paid < 0.01, (paid, total)
+    times.sort()
+    pct = lambda q: times[round(q / 100 * (len(times) - 1))] * 1000
+    print(f'{args.vendors} vendors, {args.sales} sales/tick: p50 {pct(50):.3f} ms  p99 {pct(99):.3f} ms; '
+          f'mean price {np.mean([market.price(s, now) for s in stalls]):.1%} of base')
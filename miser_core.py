@@ -0,0 +1,292 @@
+# Miser 2D - Headless simulation core
+# All game rules live here: player movement, trash bins, vendors, cooldowns
+# and the economy. Nothing in this module touches Ursina, so a World can be
+# stepped on a headless box as fast as the CPU allows. The Ursina scripts are
+# thin views that feed it input and draw whatever it reports.
+
+import math, random
+import numpy as np
+from spatial import SpatialGrid
+from loot import LootTable
+from inventory import Inventory
+from scheduler import Scheduler
+from market import Market
+
+# ----- Constants -----
+SEARCH_TIME = 5
+COOLDOWN_TIME = 10
+INTERACT_RADIUS = 1
+PLAYER_SPEED = 4
+
+# ----- Materials -----
+# materials, items, rarities and vendors are stable ids; what the player
+# reads for them lives in the locale catalogs (see i18n.py)
+class MaterialType:
+    Cloth = 'cloth'
+    Iron = 'iron'
+    Glass = 'glass'
+    Seed = 'seed'
+    Paper = 'paper'
+    Jewelry = 'jewelry'
+    AncientCoin = 'ancient_coin'
+    Gemstone = 'gemstone'
+
+ITEM_TEMPLATES = [
+    {'key':'paper', 'value':6, 'material':MaterialType.Paper, 'rarity':'common'},
+    {'key':'cloth','value':7,'material':MaterialType.Cloth,'rarity':'common'},
+    {'key':'nail','value':8,'material':MaterialType.Iron,'rarity':'uncommon'},
+    {'key':'iron','value':10,'material':MaterialType.Iron,'rarity':'uncommon'},
+    {'key':'glass','value':9,'material':MaterialType.Glass,'rarity':'uncommon'},
+    {'key':'jewelry','value':25,'material':MaterialType.Jewelry,'rarity':'rare'},
+    {'key':'ancient_coin','value':40,'material':MaterialType.Jewelry,'rarity':'epic'},
+    {'key':'gemstone','value':50,'material':MaterialType.Jewelry,'rarity':'epic'},
+]
+
+# cumulative upper bounds for a uniform roll in [0, 1)
+RARITY_TABLE = [('common', 0.6), ('uncommon', 0.85), ('rare', 0.95), ('epic', 1.0)]
+RARITY_MULTIPLIERS = {'common': 1.0, 'uncommon': 1.5, 'rare': 2.0, 'epic': 3.0}
+
+VENDORS = [
+    ('tailor', MaterialType.Cloth, (-6, 2)),
+    ('blacksmith', MaterialType.Iron, (6, 2)),
+    ('glassworker', MaterialType.Glass, (-6, -2)),
+    ('farmer', MaterialType.Seed, (6, -2)),
+    ('papermaker', MaterialType.Paper, (0, 4)),
+    ('jeweler', MaterialType.Jewelry, (0, -4)),
+]
+
+# ----- World Objects -----
+class Player:
+    def __init__(self, x=0, y=0, speed=PLAYER_SPEED):
+        self.x = x
+        self.y = y
+        self.speed = speed
+        self.moving = False
+        self.coins = 0
+        self.inventory = Inventory()
+
+
+class Bin:
+    kind = 'bin'
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.ready_at = 0
+        self.searching = False
+        self.search_timer = None  # the one pending scheduler event while searching
+        self.searcher = None      # the player who gets the loot
+
+
+class Vendor:
+    kind = 'vendor'
+
+    def __init__(self, key, accepts, x, y):
+        self.key = key
+        self.accepts = accepts
+        self.x = x
+        self.y = y
+        self.slot = None   # its row in the world's Market while it is open
+
+# ----- World -----
+class World:
+    def __init__(self, seed=None, templates=ITEM_TEMPLATES, rarity_table=RARITY_TABLE,
+                 multipliers=RARITY_MULTIPLIERS, search_time=SEARCH_TIME, cooldown_time=COOLDOWN_TIME):
+        self.rng = random.Random(seed)
+        self.loot_rng = np.random.default_rng(seed)
+        self.loot = LootTable(templates, rarity_table, multipliers)
+        self.search_time = search_time
+        self.cooldown_time = cooldown_time
+
+        self.time = 0
+        self.player = Player()
+        self.bins = []
+        self.vendors = []
+        self.grid = SpatialGrid(cell_size=2)
+        self.events = []
+        self.scheduler = Scheduler()
+        self.market = Market()
+        self.telemetry = None     # a telemetry.Telemetry to record what players do
+        self.layout_version = 0   # bumped whenever a bin or vendor is added or removed
+
+    # the local player's purse; other players (see netplay.py) carry their own
+    @property
+    def coins(self):
+        return self.player.coins
+
+    @coins.setter
+    def coins(self, value):
+        self.player.coins = value
+
+    @property
+    def inventory(self):
+        return self.player.inventory
+
+    # ----- Setup -----
+    def add_bin(self, x, y):
+        b = Bin(x, y)
+        self.bins.append(b)
+        self.grid.insert(b, x, y)
+        self.layout_version += 1
+        self.events.append(('spawned', b))
+        return b
+
+    def add_vendor(self, key, accepts, x, y):
+        v = Vendor(key, accepts, x, y)
+        self.market.open(v, self.time)
+        self.vendors.append(v)
+        self.grid.insert(v, x, y)
+        self.layout_version += 1
+        self.events.append(('spawned', v))
+        return v
+
+    def remove(self, obj):
+        if obj.kind == 'bin':
+            self.bins.remove(obj)
+            if obj.searching:
+                # an unloaded bin forgets a half-finished search
+                self.scheduler.cancel(obj.search_timer)
+                obj.search_timer = None
+                obj.searching = False
+                obj.searcher = None
+        else:
+            self.vendors.remove(obj)
+            self.market.close(obj, self.time)
+        self.grid.remove(obj)
+        self.layout_version += 1
+        self.events.append(('despawned', obj))
+
+    def scatter_bins(self, count, half_width=5, half_height=3):
+        return [self.add_bin(self.rng.uniform(-half_width, half_width), self.rng.uniform(-half_height, half_height))
+                for _ in range(count)]
+
+    def add_default_vendors(self):
+        return [self.add_vendor(name, accepts, x, y) for name, accepts, (x, y) in VENDORS]
+
+    # ----- Queries -----
+    def cooldown(self, b):
+        return max(0, b.ready_at - self.time)
+
+    def search_progress(self, b):
+        if not b.searching or b.search_timer is None:
+            return 0
+        return b.search_timer.progress(self.time)
+
+    def nearby(self, radius=INTERACT_RADIUS, player=None):
+        p = player or self.player
+        return self.grid.query_radius(p.x, p.y, radius)
+
+    def nearest(self, radius=INTERACT_RADIUS, player=None):
+        p = player or self.player
+        return self.grid.nearest(p.x, p.y, radius)
+
+    def drain_events(self):
+        events, self.events = self.events, []
+        return events
+
+    # ----- Tick -----
+    def step(self, dt, inputs=None):
+        inputs = inputs or {}
+        self.advance(dt)
+        self.move(self.player, inputs.get('move', (0, 0)), dt)
+        for key in inputs.get('keys', ()):
+            if key == 'e':
+                self.interact()
+
+    def advance(self, dt):
+        # world clock and timers only; players are moved separately
+        self.time += dt
+        self.scheduler.run_until(self.time)
+
+    def move(self, p, move, dt):
+        mx, my = move
+        length = math.hypot(mx, my)
+        p.moving = length > 0
+        if p.moving:
+            p.x += mx / length * dt * p.speed
+            p.y += my / length * dt * p.speed
+
+    # ----- Rules -----
+    # events name the player they concern as their last element
+    def interact(self, player=None):
+        p = player or self.player
+        target = self.nearest(player=p)
+        if target is None:
+            return
+        if target.kind == 'bin':
+            self.search(target, p)
+        else:
+            self.sell(target, p)
+
+    def search(self, b, player=None):
+        p = player or self.player
+        if self.cooldown(b) > 0 or b.searching:
+            self.events.append(('search_denied', b, p))
+            if self.telemetry is not None:
+                self.telemetry.emit('search_denied', self.time, b.x, b.y)
+            return False
+        b.searching = True
+        b.searcher = p
+        self.events.append(('search_started', b, p))
+        if self.telemetry is not None:
+            self.telemetry.emit('search', self.time, b.x, b.y)
+        if self.search_time <= 0:
+            self._finish_search(b)
+        else:
+            b.search_timer = self.scheduler.call_at(self.time + self.search_time, self._finish_search, b)
+        return True
+
+    def _finish_search(self, b):
+        # runs at the search's exact due time, whatever the frame rate
+        item = self.loot.roll_item(self.loot_rng)
+        p = b.searcher
+        p.inventory.add(item)
+        b.ready_at = self.scheduler.time + self.cooldown_time
+        b.searching = False
+        b.search_timer = None
+        b.searcher = None
+        self.events.append(('found', b, item, p))
+        if self.telemetry is not None:
+            self.telemetry.emit('found', self.scheduler.time, b.x, b.y, item.key, item.rarity, item.value)
+
+    def sell(self, vendor, player=None):
+        p = player or self.player
+        items, value = p.inventory.take(vendor.accepts)
+        sold = len(items)
+        if sold > 0:
+            # the whole lot at once, at the vendor's going rate
+            earned = self.market.sell(vendor, value, self.time)
+            p.coins += earned
+            self.events.append(('sold', vendor, sold, earned, p))
+            if self.telemetry is not None:
+                self.telemetry.emit('sold', self.time, vendor.key, vendor.x, vendor.y, sold, value, earned, p.coins)
+        else:
+            self.events.append(('sell_denied', vendor, p))
+            if self.telemetry is not None:
+                self.telemetry.emit('sell_denied', self.time, vendor.key, vendor.x, vendor.y)
+        return sold
+
+
+def new_world(seed=None, bins=6):
+    world = World(seed=seed)
+    world.scatter_bins(bins)
+    world.add_default_vendors()
+    return world
+
+
+if __name__ == '__main__':
+    # headless smoke run: a bot wanders and spams E
+    import time as _time
+    world = new_world(seed=1)
+    bot = random.Random(2)
+    steps = 200000
+    start = _time.perf_counter()
+    move = (0, 0)
+    for n in range(steps):
+        if n % 60 == 0:
+            move = (bot.choice((-1, 0, 1)), bot.choice((-1, 0, 1)))
+        world.step(1/60, {'move': move, 'keys': ('e',) if n % 30 == 0 else ()})
+        world.drain_events()
+    elapsed = _time.perf_counter() - start
+    print(f'{steps} steps in {elapsed:.2f}s ({steps/elapsed:.0f} ticks/s), '
+          f'{world.time/elapsed:.0f}x real time, coins={world.coins}, items={len(world.inventory)}')
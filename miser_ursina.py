@@ -1,144 +1,170 @@
 # Miser 2D Top-Down - Ursina
 # Requirements: Python 3.8+, pip install ursina
 # Run: python miser_2d.py
+# Online: python netplay.py server, then MISER_SERVER=host:port python miser_ursina.py
 
 from ursina import *
-import random
+from miser_core import World, MaterialType, INTERACT_RADIUS
+from scheduler import Scheduler
+from ui_layer import SharedTooltip, ToastQueue, ProfilerOverlay
+from profiler import profiler, profiled
+from assetpack import mount as mount_assets
+from fixedstep import FixedStep
+from netplay import RemoteWorld
+import i18n
 
 app = Ursina()
+mount_assets(application.asset_folder)   # packed assets when present, loose files otherwise
+catalog = i18n.load(i18n.current_language())   # MISER_LANG=ar for Arabic
+if catalog.font:
+    Text.default_font = catalog.font
 
 # ----- Data Definitions -----
-class MaterialType:
-    Cloth = 'Cloth'
-    Iron = 'Iron'
-    Glass = 'Glass'
-    Seed = 'Seed'
-    Paper = 'Paper'
-    Jewelry = 'Jewelry'
-
+# every item is equally likely, plus a flat 6% extra chance of Jewelry
 ITEM_TEMPLATES = [
-    {'name':'Paper',  'value':6,  'material':MaterialType.Paper},
-    {'name':'Nail',   'value':8,  'material':MaterialType.Iron},
-    {'name':'Cloth',  'value':7,  'material':MaterialType.Cloth},
-    {'name':'Glass',  'value':9,  'material':MaterialType.Glass},
-    {'name':'Seed',   'value':4,  'material':MaterialType.Seed},
-    {'name':'Jewelry','value':25, 'material':MaterialType.Jewelry},
-    {'name':'Iron',   'value':10, 'material':MaterialType.Iron},
+    {'key':'paper',  'value':6,  'material':MaterialType.Paper,   'rarity':'any'},
+    {'key':'nail',   'value':8,  'material':MaterialType.Iron,    'rarity':'any'},
+    {'key':'cloth',  'value':7,  'material':MaterialType.Cloth,   'rarity':'any'},
+    {'key':'glass',  'value':9,  'material':MaterialType.Glass,   'rarity':'any'},
+    {'key':'seed',   'value':4,  'material':MaterialType.Seed,    'rarity':'any'},
+    {'key':'jewelry','value':25, 'material':MaterialType.Jewelry, 'rarity':'any'},
+    {'key':'iron',   'value':10, 'material':MaterialType.Iron,    'rarity':'any'},
+    {'key':'jewelry','value':25, 'material':MaterialType.Jewelry, 'rarity':'bonus'},
 ]
+RARITY_TABLE = [('bonus', 0.06), ('any', 1.0)]
+RARITY_MULTIPLIERS = {'bonus': 1.0, 'any': 1.0}
+
+# ----- Simulation -----
+server = os.environ.get('MISER_SERVER')
+if server:
+    world = RemoteWorld(server)   # the server owns the rules, loot and map
+else:
+    world = World(templates=ITEM_TEMPLATES, rarity_table=RARITY_TABLE, multipliers=RARITY_MULTIPLIERS,
+                  search_time=0, cooldown_time=0)
+    world.scatter_bins(8)
+    world.add_default_vendors()
+sim = FixedStep(world)   # fixed 60 Hz steps; [ and ] change speed, P pauses (offline only)
 
 # ----- Player & Inventory -----
 player = Entity(model='quad', color=color.green, scale=(0.5,0.5), position=(0,0))
-player.speed = 4
-inventory = []
-coins = 0
 
-coins_text = Text(text=f'Coins: {coins}', position=window.top_left + Vec2(0.1,-0.05), scale=1.2, background=True)
-inv_text = Text(text='Inventory: []', position=window.top + Vec2(0,-0.05), scale=1.1, background=True)
+coins_text = Text(text=catalog.format('hud.coins', world.coins), position=window.top_left + Vec2(0.1,-0.05), scale=1.2, background=True)
+inv_text = Text(text=catalog['hud.inventory_empty'], position=window.top + Vec2(0,-0.05), scale=1.1, background=True)
 
+@profiled('refresh_inventory')
 def refresh_inventory():
-    inv_names = [item['name'] for item in inventory]
-    inv_text.text = f"Inventory: {inv_names}"
+    summary = world.inventory.summary()
+    if not summary:
+        inv_text.text = catalog['hud.inventory_empty']
+        return
+    entries = [catalog.format('hud.inventory_item', catalog['item.' + key], n) for key, n in summary]
+    inv_text.text = catalog.format('hud.inventory', catalog.join(entries))
 
-def add_coins(amount):
-    global coins
-    coins += amount
-    coins_text.text = f'Coins: {coins}'
+@profiled('refresh_coins')
+def refresh_coins():
+    coins_text.text = catalog.format('hud.coins', world.coins)
 
 # ----- Trash Bin -----
 class TrashBin(Entity):
-    def __init__(self, **kwargs):
-        super().__init__(model='quad', color=color.gray, scale=(0.6,0.6), **kwargs)
-        self.items = ITEM_TEMPLATES.copy()
-        self.tooltip = Text(parent=camera.ui, text='[E] Search', scale=0.6, color=color.white)
-        self.tooltip.enabled = False
-
-    def update(self):
-        if distance(player.position, self.position) < 1:
-            self.tooltip.enabled = True
-            self.tooltip.position = self.position + Vec2(0,0.5)
-        else:
-            self.tooltip.enabled = False
-
-    def search(self):
-        r = random.random()
-        if r < 0.06:
-            item = next(i for i in ITEM_TEMPLATES if i['name']=='Jewelry')
-        else:
-            item = random.choice(self.items)
-        picked_up(item)
-
-def picked_up(item):
-    inventory.append(item)
-    show_msg(f"Picked up {item['name']}")
-    refresh_inventory()
+    def __init__(self, state, **kwargs):
+        super().__init__(model='quad', color=color.gray, scale=(0.6,0.6), position=(state.x, state.y), **kwargs)
+        self.state = state
+        self.hint = catalog['hint.search']
 
 # ----- Vendors -----
 class Vendor(Entity):
-    def __init__(self, name, accepts, **kwargs):
-        super().__init__(model='quad', color=color.brown, scale=(0.7,0.7), **kwargs)
-        self.name = name
-        self.accepts = accepts
-        self.tooltip = Text(parent=camera.ui, text=f'[E] Sell to {name}', scale=0.6, color=color.white)
-        self.tooltip.enabled = False
-
-    def update(self):
-        if distance(player.position, self.position) < 1:
-            self.tooltip.enabled = True
-            self.tooltip.position = self.position + Vec2(0,0.5)
-        else:
-            self.tooltip.enabled = False
-
-    def sell_items(self):
-        sold = 0
-        for i in range(len(inventory)-1, -1, -1):
-            it = inventory[i]
-            if it['material'] == self.accepts:
-                add_coins(it['value'])
-                inventory.pop(i)
-                sold += 1
-        refresh_inventory()
-        if sold > 0:
-            show_msg(f"Sold {sold} item(s) to {self.name}")
-        else:
-            show_msg(f"{self.name} doesn't buy your items")
+    def __init__(self, state, **kwargs):
+        super().__init__(model='quad', color=color.brown, scale=(0.7,0.7), position=(state.x, state.y), **kwargs)
+        self.state = state
+        self.hint = catalog.format('hint.sell', catalog['vendor.' + state.key])
 
-# ----- UI Messages -----
-msg_text = Text(text='', position=window.center, scale=1.2, color=color.azure, origin=(0,0))
+# ----- Other Players -----
+class OtherPlayer(Entity):
+    def __init__(self, state, **kwargs):
+        super().__init__(model='quad', color=color.lime, scale=(0.5,0.5), position=(state.x, state.y), **kwargs)
+        self.state = state
 
-def show_msg(text, duration=1.5):
-    msg_text.text = text
-    invoke(lambda: setattr(msg_text, 'text',''), delay=duration)
+# ----- UI Messages -----
+ui_timers = Scheduler()
+toasts = ToastQueue(ui_timers, scale=1.2, color=color.azure, origin=(0,0))
+tooltip = SharedTooltip(scale=0.6, color=color.white)
+
+profiler_overlay = ProfilerOverlay(profiler, scale=0.7, color=color.white)
+
+def show_msg(key, *values, duration=1.5):
+    toasts.show(catalog.format(key, *values), duration)
+
+def handle_event(event):
+    kind = event[0]
+    if kind == 'spawned':
+        spawn_view(event[1])
+    elif kind == 'despawned':
+        destroy(views.pop(id(event[1])))
+    elif kind == 'found':
+        show_msg('msg.picked_up', catalog['item.' + event[2].key])
+        refresh_inventory()
+    elif kind == 'sold':
+        refresh_coins()
+        refresh_inventory()
+        show_msg('msg.sold', event[2], catalog['vendor.' + event[1].key], event[3])
+    elif kind == 'sell_denied':
+        show_msg('msg.sell_denied', catalog['vendor.' + event[1].key])
 
 # ----- Map Objects -----
-trash_bins = [TrashBin(position=(random.uniform(-5,5), random.uniform(-3,3))) for _ in range(8)]
-vendors = [
-    Vendor('Tailor', MaterialType.Cloth, position=(-6,2)),
-    Vendor('Blacksmith', MaterialType.Iron, position=(6,2)),
-    Vendor('Glassworker', MaterialType.Glass, position=(-6,-2)),
-    Vendor('Farmer', MaterialType.Seed, position=(6,-2)),
-    Vendor('Papermaker', MaterialType.Paper, position=(0,4)),
-    Vendor('Jeweler', MaterialType.Jewelry, position=(0,-4)),
-]
+views = {}
+
+def spawn_view(state):
+    if state.kind == 'player':
+        views[id(state)] = OtherPlayer(state)
+    else:
+        views[id(state)] = TrashBin(state) if state.kind == 'bin' else Vendor(state)
+
+@profiled('update_tooltip')
+def update_tooltip():
+    target = world.nearest(INTERACT_RADIUS)
+    if target is None:
+        tooltip.hide()
+    else:
+        view = views[id(target)]
+        tooltip.show(view.hint, view.position + Vec2(0,0.5))
 
 # ----- Player Movement -----
 def update():
+    profiler.frame(time.dt)
+    with profiler.section('ui_timers'):
+        ui_timers.advance(time.dt)
     # movement
-    if held_keys['w']: player.y += time.dt * player.speed
-    if held_keys['s']: player.y -= time.dt * player.speed
-    if held_keys['a']: player.x -= time.dt * player.speed
-    if held_keys['d']: player.x += time.dt * player.speed
+    move = (held_keys['d'] - held_keys['a'], held_keys['w'] - held_keys['s'])
+    with profiler.section('world.step'):
+        sim.advance(time.dt, move)
+    player.position = sim.player_position()
+    with profiler.section('events'):
+        for event in world.drain_events():
+            handle_event(event)
+    if server:
+        for other in world.others.values():
+            view = views[id(other)]
+            view.position = lerp(view.position, Vec3(other.x, other.y, 0), min(1, time.dt * 12))
+    update_tooltip()
+    profiler_overlay.update(time.dt)
 
 def input(key):
     if key=='e':
-        for bin in trash_bins:
-            if distance(player.position, bin.position)<1:
-                bin.search()
-                return
-        for vendor in vendors:
-            if distance(player.position, vendor.position)<1:
-                vendor.sell_items()
-                return
+        sim.press('e')
+    elif server:
+        pass   # the server runs at its own pace
+    elif key == ']':
+        show_msg('msg.speed', f'{sim.faster():g}')
+    elif key == '[':
+        show_msg('msg.speed', f'{sim.slower():g}')
+    elif key == 'p':
+        show_msg('msg.paused' if sim.toggle_pause() else 'msg.resumed')
+    trace = profiler_overlay.input(key)
+    if trace:
+        show_msg('msg.trace_saved', trace)
 
 # ----- Start -----
-show_msg('Use WASD to move, E to search or sell.', duration=4)
+for event in world.drain_events():
+    handle_event(event)
+show_msg('msg.help_basic', duration=4)
 app.run()
@@ -0,0 +1,310 @@
+# Miser 2D - Flow-field navigation
+# A fine navigation grid overlays the city, with bins and vendor stalls as
+# obstacles. Instead of every mover running its own A*, one flow field is
+# solved per goal (each vendor, each cluster of bins, or a clicked point)
+# over a window around it, holding for every cell the step toward the goal.
+# Any number of movers then only look up their cell, and a whole crowd
+# across all its fields is one gather from a shared pool. Fields are cached,
+# a few are solved per step, and a field is dropped only when an obstacle
+# inside its window changes.
+
+import math
+from collections import OrderedDict
+from itertools import chain
+import numpy as np
+
+NAV_CELL = 0.5
+FIELD_RADIUS = 16       # world units solved around a goal
+CLUSTER_SIZE = 8        # bins are grouped on this grid, one field per group
+MAX_FIELDS = 96
+SOLVES_PER_STEP = 1     # fields solved per world step for the crowd; the player never waits
+
+# (dx, dy, cost) toward each of the 8 neighbors
+_NEIGHBORS = [(dx, dy, math.hypot(dx, dy)) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+_STEPS = np.array([(dx, dy) for dx, dy, _ in _NEIGHBORS], np.int8)
+_UNITS = (_STEPS / np.hypot(_STEPS[:, 0], _STEPS[:, 1])[:, None]).astype(np.float32)
+
+
+def _solve(blocked, goals, directions):
+    # distance to the nearest goal over 8-connected cells (Bellman-Ford
+    # sweeps: every pass settles one more ring), then the best neighbor;
+    # unit directions are written into `directions`
+    w, h = blocked.shape
+    distance = np.full((w, h), np.inf, np.float32)
+    distance[goals] = 0
+    wall = blocked & ~goals
+    padded = np.full((w + 2, h + 2), np.inf, np.float32)
+    views = [(padded[1 + dx:w + 1 + dx, 1 + dy:h + 1 + dy], cost) for dx, dy, cost in _NEIGHBORS]
+    while True:
+        padded[1:-1, 1:-1] = distance
+        best = distance.copy()
+        for view, cost in views:
+            np.minimum(best, view + cost, out=best)
+        best[wall] = np.inf
+        if np.array_equal(best, distance):
+            break
+        distance = best
+    padded[1:-1, 1:-1] = distance
+    choice = np.stack([view + cost for view, cost in views]).argmin(axis=0)
+    still = (distance == 0) | ~np.isfinite(distance)
+    steps = _STEPS[choice]
+    steps[still] = 0
+    directions[:] = _UNITS[choice]
+    directions[still] = 0
+    return distance, steps
+
+
+class FlowField:
+    def __init__(self, key, origin, blocked, goals, target, cell, slot, directions):
+        self.key = key
+        self.ox, self.oy = origin     # nav cell of window index [0, 0]
+        self.size = blocked.shape[0]
+        self.target = target          # where to head from outside the window
+        self.cell = cell
+        self.slot = slot              # index of `directions` in NavGrid.pool
+        self.directions = directions
+        self.distance, self.steps = _solve(blocked, goals, directions)
+
+    def covers(self, cx, cy):
+        return 0 <= cx - self.ox < self.size and 0 <= cy - self.oy < self.size
+
+    def step_at(self, x, y):
+        # (dx, dy) in -1..1 toward the goal; (0, 0) at the goal or outside
+        ix, iy = math.floor(x / self.cell) - self.ox, math.floor(y / self.cell) - self.oy
+        if 0 <= ix < self.size and 0 <= iy < self.size:
+            dx, dy = self.steps[ix, iy]
+            return int(dx), int(dy)
+        return 0, 0
+
+
+class NavGrid:
+    def __init__(self, world, cell=NAV_CELL, radius=FIELD_RADIUS, cluster_size=CLUSTER_SIZE,
+                 max_fields=MAX_FIELDS, solves_per_step=SOLVES_PER_STEP):
+        self.world = world
+        self.cell = cell
+        self.half = math.ceil(radius / cell)
+        size = 2 * self.half + 1
+        # every cached field's directions, so a crowd samples all of them in one gather
+        self.pool = np.zeros((max_fields, size, size, 2), np.float32)
+        self.free = list(range(max_fields - 1, -1, -1))
+        self.cluster_size = cluster_size
+        self.max_fields = max_fields
+        self.solves_per_step = solves_per_step
+        self.budget = solves_per_step
+        self.blocked = {}     # nav cell -> number of objects on it
+        self.objects = {}     # id(obj) -> (obj, nav cell)
+        self.clusters = {}    # cluster key -> [bins]
+        self.fields = OrderedDict()   # key -> FlowField, least recently used first
+        self.layout = None
+        self.solved = 0
+
+    def cell_of(self, x, y):
+        return (math.floor(x / self.cell), math.floor(y / self.cell))
+
+    def cluster_of(self, x, y):
+        return (math.floor(x / self.cluster_size), math.floor(y / self.cluster_size))
+
+    # field keys are plain values, so a key outlives the objects it was made for
+    def vendor_key(self, v):
+        return ('vendor',) + self.cell_of(v.x, v.y)
+
+    def cluster_key(self, b):
+        return ('bins',) + self.cluster_of(b.x, b.y)
+
+    def point_key(self, x, y):
+        return ('point',) + self.cell_of(x, y)
+
+    # ----- Map changes -----
+    def step(self):
+        # once per world step: follow layout changes, refill the solve budget
+        self.budget = self.solves_per_step
+        if self.world.layout_version != self.layout:
+            self.sync()
+
+    def sync(self):
+        world = self.world
+        self.layout = world.layout_version
+        current = {id(obj): obj for obj in chain(world.bins, world.vendors)}
+        changed = []
+        for key in self.objects.keys() - current.keys():
+            obj, cell = self.objects.pop(key)
+            self.blocked[cell] -= 1
+            if not self.blocked[cell]:
+                del self.blocked[cell]
+            if obj.kind == 'bin':
+                cluster = self.cluster_of(obj.x, obj.y)
+                self.clusters[cluster].remove(obj)
+                if not self.clusters[cluster]:
+                    del self.clusters[cluster]
+            changed.append(cell)
+        for key in current.keys() - self.objects.keys():
+            obj = current[key]
+            cell = self.cell_of(obj.x, obj.y)
+            self.objects[key] = (obj, cell)
+            self.blocked[cell] = self.blocked.get(cell, 0) + 1
+            if obj.kind == 'bin':
+                self.clusters.setdefault(self.cluster_of(obj.x, obj.y), []).append(obj)
+            changed.append(cell)
+        if changed:
+            self._invalidate(changed)
+
+    def _invalidate(self, cells):
+        # only fields whose window saw a change; the rest stay exact
+        stale = [key for key, f in self.fields.items() if any(f.covers(cx, cy) for cx, cy in cells)]
+        for key in stale:
+            self.free.append(self.fields.pop(key).slot)
+
+    # ----- Fields -----
+    def field(self, key, force=False):
+        # cached field for key, solved now if the step's budget allows (or
+        # force); None if it has to wait or has no goal left
+        f = self.fields.get(key)
+        if f is not None:
+            self.fields.move_to_end(key)
+            return f
+        if self.budget <= 0 and not force:
+            return None
+        goal = self._goal(key)
+        if goal is None:
+            return None
+        self.budget -= 1
+        self.solved += 1
+        if not self.free:
+            self.free.append(self.fields.popitem(last=False)[1].slot)
+        center, goal_cells, target = goal
+        f = self.fields[key] = self._solve(key, center, goal_cells, target, self.free.pop())
+        return f
+
+    def sample(self, fields, which, xy):
+        # unit directions (n, 2) for movers where mover i follows
+        # fields[which[i]]: straight at the field's target outside its
+        # window, zero where the field has no step to give
+        slot = np.array([f.slot for f in fields], np.int64)[which]
+        ox = np.array([f.ox for f in fields], np.int64)[which]
+        oy = np.array([f.oy for f in fields], np.int64)[which]
+        ix = np.floor(xy[:, 0] / self.cell).astype(np.int64) - ox
+        iy = np.floor(xy[:, 1] / self.cell).astype(np.int64) - oy
+        size = self.pool.shape[1]
+        inside = (ix >= 0) & (ix < size) & (iy >= 0) & (iy < size)
+        out = np.zeros((len(xy), 2), np.float32)
+        out[inside] = self.pool[slot[inside], ix[inside], iy[inside]]
+        away = ~inside
+        if away.any():
+            target = np.array([f.target for f in fields], np.float32)[which[away]]
+            delta = target - xy[away]
+            out[away] = delta / np.maximum(np.hypot(delta[:, 0], delta[:, 1]), 1e-6)[:, None]
+        return out
+
+    def _goal(self, key):
+        kind, a, b = key
+        if kind == 'bins':
+            bins = self.clusters.get((a, b))
+            if not bins:
+                return None
+            size = self.cluster_size
+            target = ((a + 0.5) * size, (b + 0.5) * size)
+            return self.cell_of(*target), [self.cell_of(o.x, o.y) for o in bins], target
+        return (a, b), [(a, b)], ((a + 0.5) * self.cell, (b + 0.5) * self.cell)
+
+    def _solve(self, key, center, goal_cells, target, slot):
+        half = self.half
+        ox, oy = center[0] - half, center[1] - half
+        size = 2 * half + 1
+        blocked = np.zeros((size, size), bool)
+        for cx, cy in self.blocked:
+            if 0 <= cx - ox < size and 0 <= cy - oy < size:
+                blocked[cx - ox, cy - oy] = True
+        goals = np.zeros((size, size), bool)
+        for cx, cy in goal_cells:
+            if 0 <= cx - ox < size and 0 <= cy - oy < size:
+                goals[cx - ox, cy - oy] = True
+        return FlowField(key, (ox, oy), blocked, goals, target, self.cell, slot, self.pool[slot])
+
+
+class Autopilot:
+    # steers the player along flow fields: to a clicked point, or round the
+    # vendors that buy what it carries (auto-sell). FixedStep asks it for
+    # each step's input, so a recording holds ordinary moves and presses.
+    def __init__(self, world, nav):
+        self.world = world
+        self.nav = nav
+        self.mode = None      # None, 'walk' or 'sell'
+        self.goal = None
+        self.vendor = None
+
+    @property
+    def active(self):
+        return self.mode is not None
+
+    def go_to(self, x, y):
+        self.mode, self.goal = 'walk', (x, y)
+
+    def auto_sell(self):
+        self.mode, self.vendor = 'sell', None
+
+    def cancel(self):
+        self.mode = self.goal = self.vendor = None
+
+    def steer(self, step):
+        # -> (move, keys) for one world step
+        world = self.world
+        p = world.player
+        reach = p.speed * step
+        if self.mode == 'walk':
+            gx, gy = self.goal
+            if math.hypot(gx - p.x, gy - p.y) <= reach:
+                self._done('arrived')
+                return (0, 0), ()
+            return self._toward(self.nav.point_key(gx, gy), gx, gy, reach), ()
+
+        v = self.vendor
+        if v is None or v not in world.vendors:
+            v = self.vendor = self._next_vendor()
+            if v is None:
+                self._done('nothing_to_sell')
+                return (0, 0), ()
+        if world.nearest() is v:
+            self.vendor = None   # next step picks the next vendor
+            return (0, 0), ('e',)
+        return self._toward(self.nav.vendor_key(v), v.x, v.y, reach), ()
+
+    def _next_vendor(self):
+        p = self.world.player
+        inventory = self.world.inventory
+        buyers = [v for v in self.world.vendors if inventory.count_of(v.accepts)]
+        return min(buyers, key=lambda v: (v.x - p.x) ** 2 + (v.y - p.y) ** 2, default=None)
+
+    def _toward(self, key, gx, gy, reach):
+        p = self.world.player
+        f = self.nav.field(key, force=True)
+        if f is not None:
+            move = f.step_at(p.x, p.y)
+            if move != (0, 0):
+                return move
+        # in the goal cell or off the field: straight in
+        return (_sign(gx - p.x, reach), _sign(gy - p.y, reach))
+
+    def _done(self, reason):
+        self.cancel()
+        self.world.events.append(('autopilot', reason))
+
+
+def _sign(d, deadzone):
+    return 0 if abs(d) <= deadzone else (1 if d > 0 else -1)
+
+
+if __name__ == '__main__':
+    # solve every field of the start area and time it
+    import time
+    from chunks import streamed_world
+    world, chunks = streamed_world(0)
+    nav = NavGrid(world)
+    nav.step()
+    keys = [nav.vendor_key(v) for v in world.vendors] + sorted({nav.cluster_key(b) for b in world.bins})
+    start = time.perf_counter()
+    for key in keys:
+        nav.field(key, force=True)
+    elapsed = time.perf_counter() - start
+    side = 2 * nav.half + 1
+    print(f'{len(keys)} fields of {side}x{side} cells in {elapsed * 1000:.1f} ms '
+          f'({elapsed / len(keys) * 1000:.2f} ms each), {len(nav.blocked)} blocked cells')
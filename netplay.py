@@ -0,0 +1,581 @@
+# Miser 2D - Networked play
+# An asyncio server owns one World: bins and their cooldowns, vendors, loot
+# rolls and every player's coins and inventory. Clients only send input.
+# Each network tick every client gets one framed snapshot with just what
+# changed inside its view (interest management: the block of grid cells
+# around it): bins and vendors entering or leaving view, bins whose state
+# changed, nearby players that moved, and its own search/sell results.
+# Static objects are only re-examined when a player changes cell or a bin
+# in view changes, so a tick costs little more than the players' own moves.
+# RemoteWorld stands in for World in a view; `bots` is a load generator.
+#
+#   python netplay.py server --bins 3000
+#   python netplay.py bots --count 300 --seconds 30
+#   MISER_SERVER=127.0.0.1:7777 python miser_ursina.py
+
+import argparse, asyncio, itertools, math, random, socket, struct, time, zlib
+from collections import deque
+from miser_core import (World, Player, VENDORS, INTERACT_RADIUS,
+                        ITEM_TEMPLATES, RARITY_TABLE, RARITY_MULTIPLIERS)
+from loot import LootTable
+from spatial import SpatialGrid
+
+PORT = 7777
+TICK_RATE = 20
+STEPS_PER_TICK = 3          # the world still steps at 60 Hz, like single player
+VIEW_RADIUS = 12
+COMPRESS_OVER = 512         # snapshots bigger than this are zlib'd (mostly view entries)
+MAX_BACKLOG = 64 * 1024     # a client this far behind gets no new snapshot until it drains
+
+# ----- Wire format -----
+# u32 length, u8 type (+0x80 if the body is zlib-compressed), body
+MSG_WELCOME, MSG_INPUT, MSG_SNAPSHOT = 0, 1, 2
+COMPRESSED = 0x80
+_LEN = struct.Struct('<I')
+_WELCOME = struct.Struct('<IHf')       # player id, tick rate, view radius
+_INPUT = struct.Struct('<bbB')         # move x, move y, E presses
+# tick, world time, own x, y, coins, then section counts: new bins, bin
+# states, gone bins, new vendors, gone vendors, players, gone players, events
+_SNAP = struct.Struct('<IdffI8H')
+_BIN_NEW = struct.Struct('<IfffB')     # id, x, y, ready_at, searching
+_BIN_STATE = struct.Struct('<IfB')     # id, ready_at, searching
+_VENDOR_NEW = struct.Struct('<IffB')   # id, x, y, index into VENDORS
+_PLAYER = struct.Struct('<Iff')        # id, x, y
+_ID = struct.Struct('<I')
+_EVENT = struct.Struct('<BIIf')        # kind, object id, int arg, float arg
+EV_SEARCH_STARTED, EV_SEARCH_DENIED, EV_FOUND, EV_SOLD, EV_SELL_DENIED = range(1, 6)
+
+
+def frame(kind, body):
+    if len(body) > COMPRESS_OVER:
+        body = zlib.compress(body, 1)
+        kind |= COMPRESSED
+    return _LEN.pack(len(body) + 1) + bytes((kind,)) + body
+
+
+def unframe(msg):
+    kind, body = msg[0], msg[1:]
+    if kind & COMPRESSED:
+        body = zlib.decompress(body)
+    return kind & ~COMPRESSED, body
+
+
+# ----- Server -----
+class Client:
+    def __init__(self, id, player, writer):
+        self.id = id
+        self.player = player
+        self.writer = writer
+        self.move = (0, 0)
+        self.presses = 0
+        self.bins = {}       # bin id -> (ready_at, searching) as last sent
+        self.vendors = set()
+        self.players = {}    # player id -> (x, y) as last sent
+        self.events = []     # packed events not yet sent
+        self.cell = None     # interest cell the view is centered on
+        self.cells = set()   # interest cells in view
+        self.resync = False  # a snapshot was skipped: compare everything in view next time
+
+
+class GameServer:
+    def __init__(self, bins=3000, vendors=60, seed=0, tick_rate=TICK_RATE, view_radius=VIEW_RADIUS):
+        world = self.world = World(seed=seed)
+        half = math.sqrt(bins) * 2   # same bin density as a streamed chunk
+        world.scatter_bins(bins, half, half)
+        for i in range(vendors):
+            key, accepts, _ = VENDORS[i % len(VENDORS)]
+            world.add_vendor(key, accepts, world.rng.uniform(-half, half), world.rng.uniform(-half, half))
+        world.drain_events()
+        self.half = half
+
+        self.tick_rate = tick_rate
+        self.view_radius = view_radius
+        # coarse grids just for views; world.grid stays fine-grained for interaction
+        cell_size = view_radius / 2
+        self.view_span = math.ceil(view_radius / cell_size)   # cells either side of the player's
+        self.interest = SpatialGrid(cell_size=cell_size)
+        self.net_ids = {}    # id(bin or vendor) -> wire id
+        self.vendor_kinds = {id(v): next(i for i, row in enumerate(VENDORS) if row[0] == v.key) for v in world.vendors}
+        for i, obj in enumerate(world.bins + world.vendors):
+            self.net_ids[id(obj)] = i
+            self.interest.insert(obj, obj.x, obj.y)
+        self.player_grid = SpatialGrid(cell_size=cell_size)
+        self.clients = {}    # player id -> Client
+        self.by_player = {}  # id(Player) -> Client
+        self._ids = itertools.count(1)
+
+        self.tick_count = 0
+        self.tick_times = deque(maxlen=tick_rate * 10)
+        self.bytes_out = 0
+
+    # ----- Connections -----
+    async def serve(self, host='127.0.0.1', port=PORT, report_every=5):
+        server = await asyncio.start_server(self._connection, host, port, backlog=1024)
+        print(f'serving {len(self.world.bins)} bins, {len(self.world.vendors)} vendors on {host}:{port}')
+        async with server:
+            await self._run(report_every)
+
+    async def _connection(self, reader, writer):
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # spread over the map; everyone in one spot would put every player in every view
+        rng = self.world.rng
+        player = Player(rng.uniform(-self.half, self.half), rng.uniform(-self.half, self.half))
+        client = Client(next(self._ids), player, writer)
+        self.clients[client.id] = client
+        self.by_player[id(player)] = client
+        self.player_grid.insert(player, player.x, player.y)
+        writer.write(frame(MSG_WELCOME, _WELCOME.pack(client.id, self.tick_rate, self.view_radius)))
+        try:
+            while True:
+                (length,) = _LEN.unpack(await reader.readexactly(_LEN.size))
+                kind, body = unframe(await reader.readexactly(length))
+                if kind == MSG_INPUT:
+                    mx, my, presses = _INPUT.unpack(body)
+                    client.move = (max(-1, min(1, mx)), max(-1, min(1, my)))
+                    client.presses += presses
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            del self.clients[client.id]
+            del self.by_player[id(player)]
+            self.player_grid.remove(player)
+            writer.close()
+
+    # ----- Ticks -----
+    async def _run(self, report_every):
+        loop = asyncio.get_running_loop()
+        period = 1 / self.tick_rate
+        next_tick = loop.time()
+        next_report = next_tick + report_every
+        while True:
+            start = time.perf_counter()
+            self.tick()
+            self.tick_times.append(time.perf_counter() - start)
+            next_tick += period
+            now = loop.time()
+            if now >= next_report:
+                self.report()
+                next_report = now + report_every
+            # a late tick runs straight away rather than trying to catch up
+            next_tick = max(next_tick, now)
+            await asyncio.sleep(next_tick - now)
+
+    def tick(self):
+        world = self.world
+        dt = 1 / self.tick_rate / STEPS_PER_TICK
+        clients = list(self.clients.values())
+        for _ in range(STEPS_PER_TICK):
+            world.advance(dt)
+            for c in clients:
+                world.move(c.player, c.move, dt)
+        for c in clients:
+            p = c.player
+            if p.moving:
+                self.player_grid.move(p, p.x, p.y)
+            for _ in range(c.presses):
+                world.interact(p)
+            c.presses = 0
+        dirty = self._route_events()
+        self.tick_count += 1
+        for c in clients:
+            if c.writer.transport.get_write_buffer_size() > MAX_BACKLOG:
+                c.resync = True   # its last-sent state is kept, so a later snapshot catches it up
+                continue
+            data = self.snapshot(c, dirty)
+            c.writer.write(data)
+            self.bytes_out += len(data)
+
+    def _route_events(self):
+        # returns {interest cell: [bins whose state changed]}
+        ids = self.net_ids
+        dirty = {}
+        for event in self.world.drain_events():
+            kind, obj = event[0], event[1]
+            if kind in ('search_started', 'found'):
+                dirty.setdefault(self.interest.cell_of(obj.x, obj.y), []).append(obj)
+            client = self.by_player.get(id(event[-1]))
+            if client is None:
+                continue
+            if kind == 'search_started':
+                due = obj.search_timer.due if obj.search_timer else self.world.time
+                client.events.append(_EVENT.pack(EV_SEARCH_STARTED, ids[id(obj)], 0, due))
+            elif kind == 'search_denied':
+                client.events.append(_EVENT.pack(EV_SEARCH_DENIED, ids[id(obj)], 0, 0))
+            elif kind == 'found':
+                client.events.append(_EVENT.pack(EV_FOUND, ids[id(obj)], event[2].id, 0))
+            elif kind == 'sold':
+                client.events.append(_EVENT.pack(EV_SOLD, ids[id(obj)], event[2], event[3]))
+            elif kind == 'sell_denied':
+                client.events.append(_EVENT.pack(EV_SELL_DENIED, ids[id(obj)], 0, 0))
+        return dirty
+
+    def snapshot(self, c, dirty):
+        p = c.player
+        statics = self.interest.cells
+        new_bins, bin_states, gone_bins, new_vendors, gone_vendors = [], [], [], [], []
+        cx, cy = self.interest.cell_of(p.x, p.y)
+        if (cx, cy) != c.cell or c.resync:
+            span = self.view_span
+            cells = {(x, y) for x in range(cx - span, cx + span + 1) for y in range(cy - span, cy + span + 1)}
+            entered = cells if c.resync else cells - c.cells
+            for cell in entered:
+                for obj in statics.get(cell, ()):
+                    self._show(c, obj, new_bins, bin_states, new_vendors)
+            for cell in c.cells - cells:
+                for obj in statics.get(cell, ()):
+                    self._hide(c, obj, gone_bins, gone_vendors)
+            c.cell, c.cells, c.resync = (cx, cy), cells, False
+        else:
+            entered = ()
+        for cell, changed in dirty.items():
+            if cell in c.cells and cell not in entered:
+                for b in changed:
+                    self._show(c, b, new_bins, bin_states, new_vendors)
+
+        players, seen_players = [], set()
+        moving = self.player_grid.cells
+        for cell in c.cells:
+            for other in moving.get(cell, ()):
+                if other is p:
+                    continue
+                oid = self.by_player[id(other)].id
+                seen_players.add(oid)
+                pos = (other.x, other.y)
+                if c.players.get(oid) != pos:
+                    players.append(_PLAYER.pack(oid, *pos))
+                    c.players[oid] = pos
+        gone_players = [i for i in c.players if i not in seen_players]
+        for i in gone_players:
+            del c.players[i]
+
+        events, c.events = c.events, []
+        body = b''.join((
+            _SNAP.pack(self.tick_count, self.world.time, p.x, p.y, p.coins,
+                       len(new_bins), len(bin_states), len(gone_bins), len(new_vendors),
+                       len(gone_vendors), len(players), len(gone_players), len(events)),
+            *new_bins, *bin_states, *map(_ID.pack, gone_bins), *new_vendors,
+            *map(_ID.pack, gone_vendors), *players, *map(_ID.pack, gone_players), *events,
+        ))
+        return frame(MSG_SNAPSHOT, body)
+
+    def _show(self, c, obj, new_bins, bin_states, new_vendors):
+        i = self.net_ids[id(obj)]
+        if obj.kind == 'bin':
+            state = (obj.ready_at, obj.searching)
+            old = c.bins.get(i)
+            if old is None:
+                new_bins.append(_BIN_NEW.pack(i, obj.x, obj.y, *state))
+            elif old != state:
+                bin_states.append(_BIN_STATE.pack(i, *state))
+            c.bins[i] = state
+        elif i not in c.vendors:
+            new_vendors.append(_VENDOR_NEW.pack(i, obj.x, obj.y, self.vendor_kinds[id(obj)]))
+            c.vendors.add(i)
+
+    def _hide(self, c, obj, gone_bins, gone_vendors):
+        i = self.net_ids[id(obj)]
+        if obj.kind == 'bin':
+            if c.bins.pop(i, None) is not None:
+                gone_bins.append(i)
+        elif i in c.vendors:
+            c.vendors.discard(i)
+            gone_vendors.append(i)
+
+    def report(self):
+        times = sorted(self.tick_times)
+        if not times:
+            return
+        last = len(times) - 1
+        pct = lambda q: times[round(q / 100 * last)] * 1000
+        budget = 1000 / self.tick_rate
+        print(f'{len(self.clients):>4} clients  tick p50 {pct(50):6.2f} ms  p99 {pct(99):6.2f} ms '
+              f'({pct(99) / budget:.0%} of budget)  out {self.bytes_out / 1024 / len(times) * self.tick_rate:8.1f} KB/s')
+        self.tick_times.clear()
+        self.bytes_out = 0
+
+
+# ----- Client -----
+class RemoteBin:
+    kind = 'bin'
+
+    def __init__(self, id, x, y, ready_at, searching):
+        self.id = id
+        self.x = x
+        self.y = y
+        self.ready_at = ready_at
+        self.searching = searching
+
+
+class RemoteVendor:
+    kind = 'vendor'
+
+    def __init__(self, id, x, y, index):
+        self.id = id
+        self.key, self.accepts, _ = VENDORS[index]
+        self.x = x
+        self.y = y
+
+
+class RemotePlayer:
+    kind = 'player'
+
+    def __init__(self, id, x, y):
+        self.id = id
+        self.x = x
+        self.y = y
+
+
+class RemoteWorld:
+    # the parts of World a view uses, mirrored from server snapshots; the
+    # local player is predicted each step and pulled toward the server's copy
+    def __init__(self, address, timeout=5):
+        host, _, port = address.rpartition(':')
+        self.sock = socket.create_connection((host or '127.0.0.1', int(port or PORT)), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = bytearray()
+        self.connected = True
+        self.templates = LootTable(ITEM_TEMPLATES, RARITY_TABLE, RARITY_MULTIPLIERS).items
+        self.time = 0
+        self.player = Player()
+        self.grid = SpatialGrid(cell_size=2)
+        self.bins = {}
+        self.vendors = {}
+        self.others = {}
+        self.events = []
+        self.searching = None     # (bin, start, due) of our own search
+        self.move = (0, 0)
+        self.since_send = 0
+
+        kind, body = unframe(self._read_blocking())
+        self.id, self.tick_rate, self.view_radius = _WELCOME.unpack(body)
+        self.sock.setblocking(False)
+
+    @property
+    def coins(self):
+        return self.player.coins
+
+    @property
+    def inventory(self):
+        return self.player.inventory
+
+    # ----- World interface -----
+    def step(self, dt, inputs=None):
+        inputs = inputs or {}
+        self.time += dt
+        move = inputs.get('move', (0, 0))
+        presses = sum(1 for k in inputs.get('keys', ()) if k == 'e')
+        World.move(self, self.player, move, dt)
+        self.since_send += dt
+        if self.connected and (presses or move != self.move or self.since_send >= 1 / self.tick_rate):
+            self._send(frame(MSG_INPUT, _INPUT.pack(int(move[0]), int(move[1]), presses)))
+            self.move = move
+            self.since_send = 0
+        self._receive()
+
+    def cooldown(self, b):
+        return max(0, b.ready_at - self.time)
+
+    def search_progress(self, b):
+        if self.searching is None or self.searching[0] is not b:
+            return 0
+        _, start, due = self.searching
+        return min(1, (self.time - start) / (due - start)) if due > start else 1
+
+    def nearest(self, radius=INTERACT_RADIUS):
+        return self.grid.nearest(self.player.x, self.player.y, radius)
+
+    def drain_events(self):
+        events, self.events = self.events, []
+        return events
+
+    # ----- Socket -----
+    def _send(self, data):
+        try:
+            self.sock.sendall(data)
+        except (BlockingIOError, ConnectionError):
+            self._lost()
+
+    def _read_blocking(self):
+        while True:
+            if len(self.buffer) >= _LEN.size:
+                (length,) = _LEN.unpack_from(self.buffer)
+                if len(self.buffer) >= _LEN.size + length:
+                    msg = bytes(self.buffer[_LEN.size:_LEN.size + length])
+                    del self.buffer[:_LEN.size + length]
+                    return msg
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError('server closed the connection')
+            self.buffer += chunk
+
+    def _receive(self):
+        if not self.connected:
+            return
+        try:
+            while True:
+                chunk = self.sock.recv(65536)
+                if not chunk:
+                    self._lost()
+                    break
+                self.buffer += chunk
+        except BlockingIOError:
+            pass
+        except ConnectionError:
+            self._lost()
+        while len(self.buffer) >= _LEN.size:
+            (length,) = _LEN.unpack_from(self.buffer)
+            if len(self.buffer) < _LEN.size + length:
+                break
+            kind, body = unframe(bytes(self.buffer[_LEN.size:_LEN.size + length]))
+            del self.buffer[:_LEN.size + length]
+            if kind == MSG_SNAPSHOT:
+                self._apply(body)
+
+    def _lost(self):
+        if self.connected:
+            self.connected = False
+            print('lost connection to the server')
+
+    def _apply(self, body):
+        tick, now, x, y, coins, *counts = _SNAP.unpack_from(body)
+        pos = _SNAP.size
+        sections = []
+        for count, layout in zip(counts, (_BIN_NEW, _BIN_STATE, _ID, _VENDOR_NEW, _ID, _PLAYER, _ID, _EVENT)):
+            end = pos + count * layout.size
+            sections.append(layout.iter_unpack(body[pos:end]))
+            pos = end
+        new_bins, bin_states, gone_bins, new_vendors, gone_vendors, players, gone_players, events = sections
+
+        self.time = now
+        p = self.player
+        p.coins = coins
+        if math.hypot(x - p.x, y - p.y) > 1:
+            p.x, p.y = x, y      # too far off to blend
+        else:
+            p.x += (x - p.x) * 0.3
+            p.y += (y - p.y) * 0.3
+
+        for i, bx, by, ready_at, searching in new_bins:
+            b = self.bins[i] = RemoteBin(i, bx, by, ready_at, bool(searching))
+            self.grid.insert(b, bx, by)
+            self.events.append(('spawned', b))
+        for i, ready_at, searching in bin_states:
+            b = self.bins[i]
+            b.ready_at, b.searching = ready_at, bool(searching)
+        for (i,) in gone_bins:
+            self._forget(self.bins.pop(i))
+        for i, vx, vy, index in new_vendors:
+            v = self.vendors[i] = RemoteVendor(i, vx, vy, index)
+            self.grid.insert(v, vx, vy)
+            self.events.append(('spawned', v))
+        for (i,) in gone_vendors:
+            self._forget(self.vendors.pop(i))
+        for i, ox, oy in players:
+            other = self.others.get(i)
+            if other is None:
+                other = self.others[i] = RemotePlayer(i, ox, oy)
+                self.events.append(('spawned', other))
+            other.x, other.y = ox, oy
+        for (i,) in gone_players:
+            self.events.append(('despawned', self.others.pop(i)))
+
+        for kind, i, arg, value in events:
+            if kind in (EV_SEARCH_STARTED, EV_SEARCH_DENIED, EV_FOUND):
+                b = self.bins.get(i)
+                if kind == EV_SEARCH_STARTED:
+                    self.searching = (b, now, value)
+                    self.events.append(('search_started', b, p))
+                elif kind == EV_SEARCH_DENIED:
+                    self.events.append(('search_denied', b, p))
+                else:
+                    item = self.templates[arg]
+                    p.inventory.add(item)
+                    self.searching = None
+                    self.events.append(('found', b, item, p))
+            else:
+                v = self.vendors.get(i)
+                if kind == EV_SOLD:
+                    p.inventory.take(v.accepts)
+                    self.events.append(('sold', v, arg, int(value), p))
+                else:
+                    self.events.append(('sell_denied', v, p))
+
+    def _forget(self, obj):
+        self.grid.remove(obj)
+        if self.searching is not None and self.searching[0] is obj:
+            self.searching = None
+        self.events.append(('despawned', obj))
+
+
+# ----- Load generator -----
+async def bot(host, port, seconds, rng, stats):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        stats['failed'] += 1
+        return
+    loop = asyncio.get_running_loop()
+
+    async def receive():
+        while True:
+            (length,) = _LEN.unpack(await reader.readexactly(_LEN.size))
+            await reader.readexactly(length)
+            stats['messages'] += 1
+            stats['bytes'] += _LEN.size + length
+
+    receiver = asyncio.create_task(receive())
+    end = loop.time() + seconds
+    move = (0, 0)
+    try:
+        while loop.time() < end and not receiver.done():
+            if rng.random() < 0.05:
+                move = (rng.choice((-1, 0, 1)), rng.choice((-1, 0, 1)))
+            writer.write(frame(MSG_INPUT, _INPUT.pack(*move, rng.random() < 0.05)))
+            await asyncio.sleep(1 / TICK_RATE)
+    finally:
+        receiver.cancel()
+        writer.close()
+
+
+async def run_bots(host, port, count, seconds, ramp):
+    stats = {'messages': 0, 'bytes': 0, 'failed': 0}
+    tasks = []
+    for i in range(count):
+        tasks.append(asyncio.create_task(bot(host, port, seconds, random.Random(i), stats)))
+        await asyncio.sleep(ramp / count)   # don't open every connection in the same instant
+    start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start + ramp
+    per_client = stats['messages'] / max(1, count - stats['failed']) / elapsed
+    print(f"{count - stats['failed']} bots ({stats['failed']} failed to connect): "
+          f"{per_client:.1f} snapshots/s each (server tick rate {TICK_RATE}), "
+          f"{stats['bytes'] / max(1, stats['messages']):.0f} bytes per snapshot, "
+          f"{stats['bytes'] / elapsed / 1024:.0f} KB/s total")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Miser 2D server and load generator')
+    sub = parser.add_subparsers(dest='mode', required=True)
+    serve = sub.add_parser('server')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=PORT)
+    serve.add_argument('--bins', type=int, default=3000)
+    serve.add_argument('--vendors', type=int, default=60)
+    serve.add_argument('--seed', type=int, default=0)
+    bots = sub.add_parser('bots')
+    bots.add_argument('--host', default='127.0.0.1')
+    bots.add_argument('--port', type=int, default=PORT)
+    bots.add_argument('--count', type=int, default=200)
+    bots.add_argument('--seconds', type=float, default=30)
+    bots.add_argument('--ramp', type=float, default=2, help='seconds over which bots connect')
+    args = parser.parse_args()
+
+    try:
+        if args.mode == 'server':
+            asyncio.run(GameServer(args.bins, args.vendors, args.seed).serve(args.host, args.port))
+        else:
+            asyncio.run(run_bots(args.host, args.port, args.count, args.seconds, args.ramp))
+    except KeyboardInterrupt:
+        pass
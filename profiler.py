@@ -0,0 +1,130 @@
+# Miser 2D - Frame and per-system profiler
+# Sections time a block of code with perf_counter_ns; frame() records frame
+# times for percentiles. When disabled every hook returns straight away, so
+# instrumented code pays one attribute check. Traces dump in Chrome's
+# trace-event format (open in chrome://tracing or ui.perfetto.dev).
+
+import functools, json, os, time
+from collections import deque
+
+_now = time.perf_counter_ns
+
+
+class _NullSection:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL = _NullSection()
+
+
+class _Section:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = _now()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, _now())
+        return False
+
+
+class Profiler:
+    def __init__(self, history=600, trace_limit=200_000):
+        self.enabled = bool(os.environ.get('MISER_PROFILE'))
+        self.frame_times = deque(maxlen=history)   # seconds
+        self.totals = {}     # name -> [total ns, calls] since reset_window()
+        self.frames = 0      # frames since reset_window()
+        self.trace = deque(maxlen=trace_limit)
+        self._epoch = _now()
+
+    # ----- Hooks -----
+    def section(self, name):
+        if not self.enabled:
+            return _NULL
+        return _Section(self, name)
+
+    def wrap(self, name):
+        # decorator form of section() for whole functions
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = _now()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(name, start, _now())
+            return wrapper
+        return decorate
+
+    def record(self, name, start, end):
+        entry = self.totals.get(name)
+        if entry is None:
+            entry = self.totals[name] = [0, 0]
+        entry[0] += end - start
+        entry[1] += 1
+        self.trace.append((name, start, end))
+
+    def frame(self, dt):
+        if not self.enabled:
+            return
+        self.frame_times.append(dt)
+        self.frames += 1
+        now = _now()
+        self.trace.append(('frame', now - int(dt * 1e9), now))
+
+    # ----- Reports -----
+    def percentiles(self, ps=(50, 95, 99)):
+        if not self.frame_times:
+            return {p: 0 for p in ps}
+        ordered = sorted(self.frame_times)
+        last = len(ordered) - 1
+        return {p: ordered[min(last, round(p / 100 * last))] for p in ps}
+
+    def per_frame(self):
+        # [(name, ms per frame, calls per frame)], slowest first
+        frames = max(1, self.frames)
+        rows = [(name, total / 1e6 / frames, calls / frames) for name, (total, calls) in self.totals.items()]
+        rows.sort(key=lambda r: -r[1])
+        return rows
+
+    def reset_window(self):
+        self.totals = {}
+        self.frames = 0
+
+    def dump_trace(self, path=None):
+        if path is None:
+            path = f'miser_trace_{time.strftime("%Y%m%d_%H%M%S")}.json'
+        epoch = self._epoch
+        events = [
+            {'name': name, 'ph': 'X', 'pid': 0, 'tid': 0,
+             'ts': (start - epoch) / 1000, 'dur': (end - start) / 1000}
+            for name, start, end in self.trace
+        ]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return path
+
+    def dump_stats(self, path):
+        stats = {
+            'frame_ms': {f'p{p}': v * 1000 for p, v in self.percentiles().items()},
+            'systems': [{'name': n, 'ms_per_frame': ms, 'calls_per_frame': c} for n, ms, c in self.per_frame()],
+        }
+        with open(path, 'w') as f:
+            json.dump(stats, f, indent=2)
+        return path
+
+
+profiler = Profiler()
+profiled = profiler.wrap
@@ -0,0 +1,166 @@
+# Miser 2D - Input recording and headless replay
+# With a fixed step and a seeded world, a session is fully described by its
+# seed, its crowd size and the input of every step. The recorder stores those inputs as
+# run-length encoded bytes (one byte per distinct step: move x/y and E
+# presses) plus a state hash every few seconds; the replayer rebuilds the
+# world, drives it as fast as the CPU allows and checks every hash.
+#
+#   MISER_RECORD=run.mrec python testursina.py
+#   python replay.py run.mrec [--repeat 5]
+
+import argparse, atexit, hashlib, os, random, struct, sys, time
+
+MAGIC = b'MSRREC02'
+_HEADER = struct.Struct('<8sQdII')  # magic, seed, step, scavengers, checkpoint interval
+_RUN = struct.Struct('<BI')         # b'R': input byte, repeat count
+_HASH = struct.Struct('<I16s')      # b'H': ticks done, state hash
+CHECKPOINT_EVERY = 600
+
+
+def session_seed():
+    # MISER_SEED pins a run; otherwise any seed, but always a known one
+    return int(os.environ.get('MISER_SEED', random.randrange(2**32)))
+
+
+def encode(move, keys):
+    presses = min(15, sum(1 for k in keys if k == 'e'))
+    return (int(move[0]) + 1) | (int(move[1]) + 1) << 2 | presses << 4
+
+
+def decode(code):
+    return ((code & 3) - 1, (code >> 2 & 3) - 1), ('e',) * (code >> 4)
+
+
+def state_hash(world):
+    h = hashlib.blake2b(digest_size=16)
+    p = world.player
+    h.update(struct.pack('<dddq', world.time, p.x, p.y, world.coins))
+    for b in world.bins:
+        h.update(struct.pack('<ddd?', b.x, b.y, b.ready_at, b.searching))
+    for material in sorted(world.inventory.buckets):
+        h.update(material.encode())
+        h.update(world.inventory.buckets[material].tobytes())
+    return h.digest()
+
+
+class Recorder:
+    def __init__(self, path, seed, step, scavengers=0, checkpoint_every=CHECKPOINT_EVERY):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(_HEADER.pack(MAGIC, seed, step, scavengers, checkpoint_every))
+        self.checkpoint_every = checkpoint_every
+        self.code = None
+        self.run = 0
+        self.ticks = 0
+        self.world = None
+
+    def record(self, move, keys):
+        code = encode(move, keys)
+        if code == self.code and self.run < 0xFFFFFFFF:
+            self.run += 1
+        else:
+            self._flush_run()
+            self.code, self.run = code, 1
+
+    def stepped(self, world):
+        self.world = world
+        self.ticks += 1
+        if self.ticks % self.checkpoint_every == 0:
+            self._checkpoint()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self._flush_run()
+        if self.world is not None and self.ticks % self.checkpoint_every:
+            self._checkpoint()
+        self.file.close()
+
+    def _flush_run(self):
+        if self.run:
+            self.file.write(b'R' + _RUN.pack(self.code, self.run))
+            self.run = 0
+
+    def _checkpoint(self):
+        self.file.write(b'H' + _HASH.pack(self.ticks, state_hash(self.world)))
+
+
+def recorder_from_env(seed, step, scavengers=0):
+    path = os.environ.get('MISER_RECORD')
+    if not path:
+        return None
+    recorder = Recorder(path, seed, step, scavengers)
+    atexit.register(recorder.close)
+    return recorder
+
+
+def read_log(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, seed, step, scavengers, _ = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a Miser 2D recording from this version')
+    runs, checkpoints = [], {}
+    pos = _HEADER.size
+    while pos < len(data):
+        tag = data[pos:pos + 1]
+        if tag == b'R':
+            runs.append(_RUN.unpack_from(data, pos + 1))
+            pos += 1 + _RUN.size
+        elif tag == b'H':
+            ticks, digest = _HASH.unpack_from(data, pos + 1)
+            checkpoints[ticks] = digest
+            pos += 1 + _HASH.size
+        else:
+            raise ValueError(f'{path}: bad record at byte {pos}')
+    return seed, step, scavengers, runs, checkpoints
+
+
+def replay(path):
+    # returns (ticks, seconds, [ticks whose hash differs])
+    from chunks import streamed_world
+    from fixedstep import FixedStep
+    from scavengers import Scavengers
+    from nav import NavGrid
+    seed, step, scavengers, runs, checkpoints = read_log(path)
+    world, chunks = streamed_world(seed)
+    nav = NavGrid(world)
+    crowd = Scavengers(world, scavengers, seed, nav=nav)
+
+    def after_step():
+        # same per-step chunk streaming, navigation and crowd as the game;
+        # autopilot moves were recorded as plain input
+        chunks.update(world.player.x, world.player.y)
+        nav.step()
+        crowd.step(step)
+
+    sim = FixedStep(world, step, on_step=after_step)
+    mismatches = []
+    start = time.perf_counter()
+    for code, count in runs:
+        move, keys = decode(code)
+        for _ in range(count):
+            sim.tick(move, keys)
+            world.events.clear()
+            expected = checkpoints.get(sim.steps)
+            if expected is not None and state_hash(world) != expected:
+                mismatches.append(sim.steps)
+    return sim.steps, time.perf_counter() - start, mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay a recorded Miser 2D session headlessly')
+    parser.add_argument('log')
+    parser.add_argument('--repeat', type=int, default=1, help='replay several times, e.g. as a benchmark')
+    args = parser.parse_args()
+
+    failed = False
+    for _ in range(args.repeat):
+        ticks, elapsed, mismatches = replay(args.log)
+        print(f'{ticks} ticks in {elapsed:.3f}s ({ticks / elapsed:.0f} ticks/s)', end='')
+        if mismatches:
+            failed = True
+            print(f'  DIVERGED at tick {mismatches[0]} ({len(mismatches)} bad checkpoints)')
+        else:
+            print('  all checkpoints match')
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,400 @@
+# Miser 2D - Autosave
+# Coins, inventory and every bin cooldown survive a restart. The city is
+# rebuilt from the session seed, so only what the player changed is kept:
+# position and purse, the inventory as 2-byte template ids per material,
+# per chunk the cooldowns still running, the vendors whose prices have not
+# recovered yet, and where the loot (and crowd) random streams had got to,
+# so a restart never re-rolls the same finds. A save is a full snapshot plus
+# a journal: each autosave appends only what changed since the last one
+# (new items at the end of a bucket, chunks whose cooldowns moved), and
+# every few autosaves the journal is folded into a new snapshot. Records
+# are checksummed, snapshots replace the old file atomically, and all disk
+# work happens on a writer thread, so the frame only gathers bytes.
+#
+#   MISER_SAVE=run.msav python testursina.py      # MISER_SAVE= turns it off
+
+import atexit, hashlib, os, queue, struct, threading, zlib
+from array import array
+from pathlib import Path
+
+MAGIC = b'MSRSAV01'
+JOURNAL_MAGIC = b'MSRJRN01'
+_HEADER = struct.Struct('<8sI')       # magic, generation (a journal only follows its own snapshot)
+_RECORD = struct.Struct('<BII')       # tag, payload size, crc32 of the payload
+_SESSION = struct.Struct('<Q16s')     # seed, loot table fingerprint
+_STATE = struct.Struct('<dddq')       # world time, player x, y, coins
+_CHUNK = struct.Struct('<iiH')        # chunk x, y, bins; then float32 cooldown left per bin
+_RNG = struct.Struct('<16s16sBI')     # PCG64 state, increment, has_uint32, uinteger
+_VENDOR = struct.Struct('<dddd')      # after a vendor's key: x, y, supply, world time it is as of
+
+SESSION, STATE, BUCKET, APPEND, COOLDOWNS, RNG, MARKET = b'SPBACRM'
+AUTOSAVE_EVERY = 5        # seconds of real time between autosaves
+SNAPSHOT_EVERY = 12       # autosaves between full snapshots
+SAVE_PATH = Path.home() / '.miser2d' / 'save.msav'
+
+
+def save_path():
+    # None when saving is off. A pinned seed or a recording is a fresh,
+    # reproducible session, so it neither resumes nor overwrites the save.
+    if os.environ.get('MISER_SEED') or os.environ.get('MISER_RECORD'):
+        return None
+    path = os.environ.get('MISER_SAVE', SAVE_PATH)
+    return Path(path) if path else None
+
+
+def fingerprint(loot):
+    # saved ids only mean something against the same loot table
+    h = hashlib.blake2b(digest_size=16)
+    for item in loot.items:
+        h.update(f'{item.key}|{item.material}|{item.rarity}|{item.value};'.encode())
+    return h.digest()
+
+
+# ----- Records -----
+def _record(tag, payload):
+    return _RECORD.pack(tag, len(payload), zlib.crc32(payload)) + payload
+
+
+def _named(tag, name, raw):
+    name = name.encode()
+    return _record(tag, bytes([len(name)]) + name + raw)
+
+
+def _bucket(tag, material, ids):
+    return _named(tag, material, ids.tobytes())
+
+
+def _cooldowns(key, ready, now):
+    left = array('f', (r - now for r in ready))
+    return _record(COOLDOWNS, _CHUNK.pack(key[0], key[1], len(left)) + left.tobytes())
+
+
+def _market(levels):
+    # the whole market in one record: it is small, and changes only on a sale
+    raw = bytearray()
+    for key, x, y, supply, time in levels:
+        key = key.encode()
+        raw += bytes([len(key)]) + key + _VENDOR.pack(x, y, supply, time)
+    return bytes(raw)
+
+
+def rng_state(generator):
+    # a numpy PCG64 Generator's position in its stream, as bytes
+    state = generator.bit_generator.state
+    return _RNG.pack(state['state']['state'].to_bytes(16, 'little'), state['state']['inc'].to_bytes(16, 'little'),
+                     state['has_uint32'], state['uinteger'])
+
+
+def set_rng_state(generator, raw):
+    state, inc, has_uint32, uinteger = _RNG.unpack(raw)
+    generator.bit_generator.state = {
+        'bit_generator': 'PCG64',
+        'state': {'state': int.from_bytes(state, 'little'), 'inc': int.from_bytes(inc, 'little')},
+        'has_uint32': has_uint32, 'uinteger': uinteger,
+    }
+
+
+def _records(data):
+    # (tag, payload) up to the end or the first torn or corrupt record
+    view = memoryview(data)
+    pos = _HEADER.size
+    while pos + _RECORD.size <= len(view):
+        tag, size, crc = _RECORD.unpack_from(view, pos)
+        payload = view[pos + _RECORD.size:pos + _RECORD.size + size]
+        if len(payload) < size or zlib.crc32(payload) != crc:
+            return
+        yield tag, payload
+        pos += _RECORD.size + size
+
+
+class SaveData:
+    # what a save file (snapshot plus journal) holds
+    def __init__(self):
+        self.seed = None
+        self.loot = None
+        self.time = 0.0
+        self.x = self.y = 0.0
+        self.coins = 0
+        self.buckets = {}     # material -> array('H') of template ids, in first-found order
+        self.cooldowns = {}   # chunk key -> array('d') of bin ready_at times
+        self.rngs = {}        # generator name ('loot', 'crowd') -> rng_state bytes
+        self.market = []      # Market.levels() tuples
+
+    def apply(self, tag, payload):
+        if tag == SESSION:
+            self.seed, self.loot = _SESSION.unpack(payload)
+        elif tag == STATE:
+            self.time, self.x, self.y, self.coins = _STATE.unpack(payload)
+        elif tag in (BUCKET, APPEND):
+            size = payload[0]
+            material = bytes(payload[1:1 + size]).decode()
+            ids = array('H')
+            ids.frombytes(payload[1 + size:])
+            if tag == APPEND and material in self.buckets:
+                self.buckets[material].extend(ids)
+            elif ids:
+                self.buckets[material] = ids
+            else:
+                self.buckets.pop(material, None)
+        elif tag == COOLDOWNS:
+            cx, cy, n = _CHUNK.unpack_from(payload)
+            left = array('f')
+            left.frombytes(payload[_CHUNK.size:_CHUNK.size + 4 * n])
+            # cooldowns are stored relative to the state record they follow
+            self.cooldowns[(cx, cy)] = array('d', (self.time + r for r in left))
+        elif tag == RNG:
+            size = payload[0]
+            self.rngs[bytes(payload[1:1 + size]).decode()] = bytes(payload[1 + size:])
+        elif tag == MARKET:
+            self.market, pos = [], 0
+            while pos < len(payload):
+                size = payload[pos]
+                key = bytes(payload[pos + 1:pos + 1 + size]).decode()
+                pos += 1 + size
+                self.market.append((key, *_VENDOR.unpack_from(payload, pos)))
+                pos += _VENDOR.size
+
+    def restore(self, world, chunks):
+        # onto a world freshly built from self.seed
+        if self.loot != fingerprint(world.loot):
+            raise ValueError('the save was made with a different loot table')
+        world.time = world.scheduler.time = self.time
+        p = world.player
+        p.x, p.y, p.coins = self.x, self.y, self.coins
+        for material, ids in self.buckets.items():
+            p.inventory.restore(material, ids, world.loot.items)
+        chunks.restore_cooldowns({k: r for k, r in self.cooldowns.items() if max(r) > self.time})
+        if 'loot' in self.rngs:
+            set_rng_state(world.loot_rng, self.rngs['loot'])
+        # vendors streamed in below pick up their saved supply when they open
+        world.market.restore(self.market)
+        chunks.update(p.x, p.y)
+
+
+def read(path):
+    # SaveData, or None if there is no save yet; ValueError if it is unusable
+    path = Path(path)
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    magic, generation = _HEADER.unpack_from(data, 0) if len(data) >= _HEADER.size else (None, None)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a Miser 2D save from this version')
+    save = SaveData()
+    for tag, payload in _records(data):
+        save.apply(tag, payload)
+    if save.seed is None:
+        raise ValueError(f'{path} is damaged')
+    try:
+        journal = _journal_path(path).read_bytes()
+    except FileNotFoundError:
+        journal = b''
+    # a journal left over from an older snapshot is already folded into this one
+    if journal[:_HEADER.size] == _HEADER.pack(JOURNAL_MAGIC, generation):
+        for tag, payload in _records(journal):
+            save.apply(tag, payload)
+    return save
+
+
+def _journal_path(path):
+    return path.with_name(path.name + '.journal')
+
+
+# ----- Writing -----
+class Autosave:
+    def __init__(self, path, world, chunks, seed, every=AUTOSAVE_EVERY, snapshot_every=SNAPSHOT_EVERY, resumed=None):
+        self.path = Path(path)
+        self.world = world
+        self.chunks = chunks
+        self.session = _record(SESSION, _SESSION.pack(seed, fingerprint(world.loot)))
+        self.every = every
+        self.snapshot_every = snapshot_every
+        self.timer = 0.0
+        self.appends = None   # autosaves since the last snapshot; None before the first
+        # random, so no journal from an earlier run can pass for this run's
+        self.generation = int.from_bytes(os.urandom(4), 'little')
+        self.state = None
+        self.buckets = {}     # material -> (bucket, length) as last written
+        self.cooldowns = {}   # chunk key -> ready_at bytes as last written
+        self.generators = {'loot': world.loot_rng}
+        self.rngs = {}        # generator name -> rng_state as last written
+        self.market = None    # market record payload as last written
+        self.resumed = resumed.rngs if resumed is not None else {}
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self._work, name='autosave', daemon=True)
+        self.thread.start()
+
+    def keep_rng(self, name, generator):
+        # save another random stream too; a resumed game carries it on
+        raw = self.resumed.get(name)
+        if raw is not None:
+            set_rng_state(generator, raw)
+        self.generators[name] = generator
+
+    def update(self, dt):
+        # real seconds, from the frame loop
+        self.timer += dt
+        if self.timer >= self.every:
+            self.timer = 0.0
+            self.save()
+
+    def save(self):
+        if self.appends is None or self.appends >= self.snapshot_every - 1:
+            self.snapshot()
+            return
+        self.appends += 1
+        records = self._changes()
+        if records:
+            self.jobs.put(('append', b''.join(records)))
+
+    def snapshot(self):
+        self.buckets, self.cooldowns, self.rngs, self.market, self.state = {}, {}, {}, None, None
+        self.appends = 0
+        self.generation = (self.generation + 1) & 0xFFFFFFFF
+        records = [self.session] + self._changes(full=True)
+        self.jobs.put(('snapshot', self.generation, b''.join(records)))
+
+    def close(self):
+        # a last snapshot, written before returning
+        if self.thread.is_alive():
+            self.snapshot()
+            self.jobs.put(None)
+            self.thread.join()
+
+    def _changes(self, full=False):
+        # records for everything that differs from what was last written
+        world = self.world
+        p = world.player
+        now = world.time
+        state = _STATE.pack(now, p.x, p.y, p.coins)
+        cooldowns = self.chunks.cooldowns()
+        out = []
+        for material, bucket in p.inventory.buckets.items():
+            written = self.buckets.get(material)
+            if written is not None and written[0] is bucket:
+                if written[1] == len(bucket):
+                    continue
+                # buckets only grow until they are sold, so the tail is enough
+                out.append(_bucket(APPEND, material, bucket[written[1]:]))
+            else:
+                out.append(_bucket(BUCKET, material, bucket))
+            self.buckets[material] = (bucket, len(bucket))
+        for material in [m for m in self.buckets if m not in p.inventory.buckets]:
+            del self.buckets[material]
+            out.append(_bucket(BUCKET, material, array('H')))
+        for key, ready in cooldowns.items():
+            raw = ready.tobytes()
+            if self.cooldowns.get(key) != raw:
+                self.cooldowns[key] = raw
+                out.append(_cooldowns(key, ready, now))
+        # expired cooldowns need no record: a fresh chunk is the same thing
+        for key in [k for k in self.cooldowns if k not in cooldowns]:
+            del self.cooldowns[key]
+        for name, generator in self.generators.items():
+            raw = rng_state(generator)
+            if self.rngs.get(name) != raw:
+                self.rngs[name] = raw
+                out.append(_named(RNG, name, raw))
+        market = _market(world.market.levels())
+        if market != self.market:
+            self.market = market
+            out.append(_record(MARKET, market))
+        if out or full or state != self.state:
+            self.state = state
+            out.insert(0, _record(STATE, state))
+        return out
+
+    def _work(self):
+        journal = None
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            try:
+                if job[0] == 'snapshot':
+                    _, generation, body = job
+                    if journal is not None:
+                        journal.close()
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    _replace(self.path, _HEADER.pack(MAGIC, generation) + body)
+                    _replace(_journal_path(self.path), _HEADER.pack(JOURNAL_MAGIC, generation))
+                    journal = open(_journal_path(self.path), 'ab')
+                else:
+                    journal.write(job[1])
+                    journal.flush()
+                    os.fsync(journal.fileno())
+            except OSError as e:
+                print(f'autosave: {e}')
+        if journal is not None:
+            journal.close()
+
+
+def _replace(path, data):
+    partial = path.with_name(path.name + '.tmp')
+    with open(partial, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(partial, path)
+
+
+def resume_or_start(world_factory, seed):
+    # (world, chunks, autosave or None): the saved session if there is one
+    path = save_path()
+    save = None
+    if path is not None:
+        try:
+            save = read(path)
+        except ValueError as e:
+            print(f'autosave: {e}; starting a new game')
+    world, chunks = world_factory(save.seed if save else seed)
+    if save is not None:
+        try:
+            save.restore(world, chunks)
+        except ValueError as e:
+            print(f'autosave: {e}; starting a new game')
+            world, chunks = world_factory(seed)
+            save = None
+    if path is None:
+        return world, chunks, None
+    autosave = Autosave(path, world, chunks, save.seed if save else seed, resumed=save)
+    atexit.register(autosave.close)
+    return world, chunks, autosave
+
+
+if __name__ == '__main__':
+    # save and load a large session and time it
+    import tempfile, time
+    from chunks import streamed_world
+    world, chunks = streamed_world(1)
+    for _ in range(100_000):
+        world.inventory.add(world.loot.roll_item(world.loot_rng))
+    world.time = 1000.0
+    for i in range(400):
+        ready = array('d', (world.time + 5.0 for _ in range(12)))
+        chunks.saved[(i, 40 + i % 20)] = ready
+    with tempfile.TemporaryDirectory() as folder:
+        path = Path(folder) / 'bench.msav'
+        saver = Autosave(path, world, chunks, 1)
+        start = time.perf_counter()
+        saver.save()
+        gathered = time.perf_counter() - start
+        for _ in range(50):
+            world.inventory.add(world.loot.roll_item(world.loot_rng))
+        start = time.perf_counter()
+        saver.save()
+        delta = time.perf_counter() - start
+        saver.close()
+        start = time.perf_counter()
+        save = read(path)
+        loaded = time.perf_counter() - start
+        fresh, fresh_chunks = streamed_world(save.seed)
+        start = time.perf_counter()
+        save.restore(fresh, fresh_chunks)
+        restored = time.perf_counter() - start
+        size = path.stat().st_size
+    assert len(fresh.inventory) == len(world.inventory) and fresh.coins == world.coins
+    print(f'{len(world.inventory)} items, {sum(map(len, chunks.cooldowns().values()))} cooling bins: '
+          f'snapshot {size / 1024:.0f} KB, gathered in {gathered * 1000:.1f} ms, '
+          f'50-item autosave {delta * 1000:.2f} ms, read {loaded * 1000:.1f} ms, restore {restored * 1000:.1f} ms')
@@ -0,0 +1,280 @@
+# Miser 2D - NPC scavengers
+# A crowd of rival scavengers walks to bins, searches them (holding the bin
+# for the world's search time and leaving it on the same cooldown a player
+# would) and carries every find to a vendor that buys it, at the same
+# market price a player gets (see market.py). Each agent's position and
+# state live in NumPy arrays and the whole crowd moves in one batched step
+# per world tick; only agents that arrive somewhere this tick touch Python
+# objects. Like the player, the crowd is drawn between its positions before
+# and after the last step. Given a nav.NavGrid, walkers share its flow fields
+# (one per vendor and per bin cluster) to steer around bins and stalls.
+# Nothing here touches Ursina.
+#
+#   MISER_SCAVENGERS=10000 python testursina.py
+
+import os
+import numpy as np
+
+SCAVENGERS = 300
+SCAVENGER_SPEED = 2.5
+ARRIVE_RADIUS = 0.5   # close enough to search or sell
+SPAWN_SPREAD = 20     # agents start within this distance of the player
+THINK_TIME = (0.5, 2.0)   # an agent with nothing to do looks again after this long
+CHOICES = 4           # an agent walks to the nearest of this many random free bins
+FIELD_HANDOFF = 1.5   # closer than this, walk straight at the target
+
+IDLE, TO_BIN, SEARCHING, TO_VENDOR = range(4)
+
+
+def crowd_size():
+    return int(os.environ.get('MISER_SCAVENGERS', SCAVENGERS))
+
+
+class Scavengers:
+    def __init__(self, world, count, seed=None, speed=SCAVENGER_SPEED, spread=SPAWN_SPREAD, nav=None):
+        self.world = world
+        self.nav = nav
+        self.count = count
+        self.speed = speed
+        # a stream of its own, so the crowd never shifts the player's loot rolls
+        self.rng = np.random.default_rng(None if seed is None else [seed, 1])
+        p = world.player
+        self.pos = (self.rng.uniform(-spread, spread, (count, 2)) + (p.x, p.y)).astype(np.float32)
+        self.previous = self.pos.copy()   # positions before the last step
+        self.drawn = np.empty_like(self.pos)
+        self.state = np.full(count, IDLE, np.int8)
+        self.target = np.full(count, -1, np.int32)   # bin or vendor index, by state
+        self.due = world.time + self.rng.uniform(*THINK_TIME, count)   # next think, or search end
+        self.item = np.full(count, -1, np.int16)     # carried loot table id
+        self.coins = np.zeros(count, np.int64)
+
+        self.layout = None
+        self.bins, self.vendors = [], []
+        self.bin_xy = np.empty((0, 2), np.float32)
+        self.vendor_xy = np.empty((0, 2), np.float32)
+        self.vendor_slot = np.empty(0, np.intp)   # vendor index -> its world.market row
+        self.buyers = np.empty((world.loot.size, 0), bool)   # item id x vendor -> buys it
+        self.field_keys = []                   # nav field key per vendor, then per bin cluster
+        self.bin_field = np.empty(0, np.int32)   # bin index -> its cluster's slot in field_keys
+        self.bin_cluster = np.empty((0, 2), np.int64)   # bin index -> cluster cell
+
+    def __len__(self):
+        return self.count
+
+    def step(self, dt):
+        # call once per world step, after World.step
+        world = self.world
+        now = world.time
+        np.copyto(self.previous, self.pos)
+        if world.layout_version != self.layout:
+            self._relayout(now)
+        state = self.state
+        done = np.flatnonzero((state == SEARCHING) & (self.due <= now))
+        if len(done):
+            self._finish(done, now)
+        free = np.fromiter((not b.searching and b.ready_at <= now for b in self.bins), bool, len(self.bins))
+        # someone else got there first: give up on the way, not on arrival
+        chasing = np.flatnonzero(state == TO_BIN)
+        beaten = chasing[~free[self.target[chasing]]]
+        self._wait(beaten, now)
+        think = np.flatnonzero((state == IDLE) & (self.due <= now))
+        if len(think):
+            carrying = self.item[think] >= 0
+            self._pick_vendors(think[carrying], now)
+            self._pick_bins(think[~carrying], free, now)
+        self._walk(dt, now)
+
+    # ----- Layout -----
+    def _relayout(self, now):
+        # bins and vendors come and go with chunk streaming; targets are
+        # indices, so remap them and send agents whose target left to think
+        world = self.world
+        old_bins, old_vendors = self.bins, self.vendors
+        self.bins, self.vendors = list(world.bins), list(world.vendors)
+        self.layout = world.layout_version
+        self.bin_xy = np.array([(b.x, b.y) for b in self.bins], np.float32).reshape(-1, 2)
+        self.vendor_xy = np.array([(v.x, v.y) for v in self.vendors], np.float32).reshape(-1, 2)
+        self.vendor_slot = np.array([v.slot for v in self.vendors], np.intp)
+        self.buyers = np.array([[v.accepts == item.material for v in self.vendors] for item in world.loot.items],
+                               bool).reshape(world.loot.size, len(self.vendors))
+        if self.nav is not None:
+            clusters = [self.nav.cluster_key(b) for b in self.bins]
+            slots = {key: len(self.vendors) + i for i, key in enumerate(sorted(set(clusters)))}
+            self.field_keys = [self.nav.vendor_key(v) for v in self.vendors] + sorted(slots, key=slots.get)
+            self.bin_field = np.array([slots[key] for key in clusters], np.int32)
+            self.bin_cluster = np.array([key[1:] for key in clusters], np.int64).reshape(-1, 2)
+
+        state, target = self.state, self.target
+        for kinds, old, new in (((TO_BIN, SEARCHING), old_bins, self.bins), ((TO_VENDOR,), old_vendors, self.vendors)):
+            where = {id(obj): i for i, obj in enumerate(new)}
+            # the trailing -1 maps target -1 to itself
+            remap = np.array([where.get(id(obj), -1) for obj in old] + [-1], np.int32)
+            mask = np.isin(state, kinds)
+            target[mask] = remap[target[mask]]
+        lost = (state != IDLE) & (target < 0)
+        state[lost] = IDLE
+        self.due[lost] = now
+
+    # ----- Decisions -----
+    def _wait(self, agents, now):
+        self.state[agents] = IDLE
+        self.due[agents] = now + self.rng.uniform(*THINK_TIME, len(agents))
+
+    def _pick_bins(self, agents, free, now):
+        if not len(agents):
+            return
+        candidates = np.flatnonzero(free)
+        if not len(candidates):
+            self._wait(agents, now)
+            return
+        # nearest of a few random free bins: short walks, but the crowd
+        # spreads out instead of everyone rushing the one closest bin
+        choice = candidates[self.rng.integers(len(candidates), size=(len(agents), CHOICES))]
+        delta = self.bin_xy[choice] - self.pos[agents, None, :]
+        d2 = (delta * delta).sum(axis=2)
+        self.target[agents] = choice[np.arange(len(agents)), d2.argmin(axis=1)]
+        self.state[agents] = TO_BIN
+
+    def _pick_vendors(self, agents, now):
+        if not len(agents):
+            return
+        buys = self.buyers[self.item[agents]]
+        delta = self.vendor_xy[None, :, :] - self.pos[agents, None, :]
+        d2 = (delta * delta).sum(axis=2)
+        d2[~buys] = np.inf
+        best = d2.argmin(axis=1) if d2.shape[1] else np.zeros(len(agents), np.int64)
+        ok = buys.any(axis=1)
+        # nobody nearby buys it: hold on to it and look again later
+        self._wait(agents[~ok], now)
+        self.target[agents[ok]] = best[ok]
+        self.state[agents[ok]] = TO_VENDOR
+
+    # ----- Movement -----
+    def _walk(self, dt, now):
+        state = self.state
+        moving = np.flatnonzero((state == TO_BIN) | (state == TO_VENDOR))
+        if not len(moving):
+            return
+        to_bin = state[moving] == TO_BIN
+        target = self.target[moving]
+        dest = np.empty((len(moving), 2), np.float32)
+        dest[to_bin] = self.bin_xy[target[to_bin]]
+        dest[~to_bin] = self.vendor_xy[target[~to_bin]]
+        delta = dest - self.pos[moving]
+        dist = np.hypot(delta[:, 0], delta[:, 1])
+        heading = delta / np.maximum(dist, 1e-6)[:, None]
+        if self.nav is not None:
+            self._follow_fields(moving, to_bin, target, dist, heading)
+        travel = np.minimum(dist, self.speed * dt)
+        vel = heading * (travel / dt)[:, None]
+        self.pos[moving] += vel * dt
+
+        arrived = dist - travel <= ARRIVE_RADIUS
+        if arrived.any():
+            self._arrive_at_bins(moving[arrived & to_bin], now)
+            self._sell(moving[arrived & ~to_bin], now)
+
+    def _follow_fields(self, moving, to_bin, target, dist, heading):
+        # walkers bound for the same vendor or bin cluster share one field;
+        # close in (or while a field waits to be solved) they walk straight.
+        # A cluster's field ends at whichever of its bins is nearest, so
+        # inside the target's cluster it would pull toward the wrong one.
+        slot = target.copy()
+        slot[to_bin] = self.bin_field[target[to_bin]]
+        far = dist > FIELD_HANDOFF
+        cluster = np.floor(self.pos[moving[to_bin]] / self.nav.cluster_size).astype(np.int64)
+        far[to_bin] &= (cluster != self.bin_cluster[target[to_bin]]).any(axis=1)
+        far = np.flatnonzero(far)
+        if not len(far):
+            return
+        slots, which = np.unique(slot[far], return_inverse=True)
+        fields = [self.nav.field(self.field_keys[s]) for s in slots.tolist()]
+        ready = np.array([f is not None for f in fields])
+        use = ready[which]
+        if not use.any():
+            return
+        # index into the solved fields only
+        which = (np.cumsum(ready) - 1)[which[use]]
+        walkers = far[use]
+        steer = self.nav.sample([f for f in fields if f is not None], which, self.pos[moving[walkers]])
+        # zero at a field's own goal cell, which may be another bin of the cluster
+        ok = steer.any(axis=1)
+        heading[walkers[ok]] = steer[ok]
+
+    # ----- Rules -----
+    def _arrive_at_bins(self, agents, now):
+        # first come, first served, in agent order so replays agree
+        world = self.world
+        for i in agents.tolist():
+            b = self.bins[self.target[i]]
+            if b.searching or b.ready_at > now:
+                self._wait(np.array([i]), now)   # two arrived in the same step
+                continue
+            b.searching = True   # a player trying it now is denied, as with another player
+            self.state[i] = SEARCHING
+            self.due[i] = now + world.search_time
+
+    def _finish(self, agents, now):
+        world = self.world
+        self.item[agents] = world.loot.roll(len(agents), self.rng)
+        for i in self.target[agents].tolist():
+            b = self.bins[i]
+            b.searching = False
+            b.ready_at = now + world.cooldown_time
+            world.events.append(('scavenged', b))
+        self.state[agents] = IDLE
+        self.due[agents] = now
+
+    def _sell(self, agents, now):
+        if not len(agents):
+            return
+        # all of this tick's sales in one batch; agent order decides who
+        # sells first at a busy stall
+        slots = self.vendor_slot[self.target[agents]]
+        self.coins[agents] += self.world.market.sell_many(slots, self.world.loot.values[self.item[agents]], now)
+        self.item[agents] = -1
+        self.state[agents] = IDLE
+        self.due[agents] = now
+
+    # ----- Render side -----
+    def positions(self, alpha=1.0):
+        # float32 (count, 2), `alpha` (0..1, FixedStep.alpha) of the way from
+        # the positions before the last step to the current ones
+        if alpha >= 1:
+            return self.pos
+        np.subtract(self.pos, self.previous, out=self.drawn)
+        self.drawn *= alpha
+        self.drawn += self.previous
+        return self.drawn
+
+
+if __name__ == '__main__':
+    # headless crowd benchmark on the streamed city
+    import argparse, time
+    from chunks import streamed_world
+    from nav import NavGrid
+    parser = argparse.ArgumentParser(description='Time the NPC scavenger step')
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--seconds', type=float, default=60, help='simulated time')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    world, chunks = streamed_world(args.seed)
+    nav = NavGrid(world)
+    crowd = Scavengers(world, args.count, args.seed, nav=nav)
+    dt = 1 / 60
+    times = []
+    for _ in range(int(args.seconds / dt)):
+        world.step(dt)
+        start = time.perf_counter()
+        nav.step()
+        crowd.step(dt)
+        times.append(time.perf_counter() - start)
+        world.drain_events()
+    times.sort()
+    pct = lambda q: times[round(q / 100 * (len(times) - 1))] * 1000
+    print(f'{args.count} scavengers: step p50 {pct(50):.3f} ms  p99 {pct(99):.3f} ms '
+          f'(frame budget {dt * 1000:.1f} ms)')
+    searching = int((crowd.state == SEARCHING).sum())
+    print(f'{searching} searching, {int((crowd.item >= 0).sum())} carrying, '
+          f'{int(crowd.coins.sum())} coins earned in {world.time:.0f}s')
@@ -0,0 +1,88 @@
+# Miser 2D - Heap-based timer scheduler
+# One priority queue for every delayed or repeating callback, advanced from
+# the main update. A pending timer costs nothing until it is due, so hundreds
+# of concurrent searches add no per-frame work.
+
+import heapq
+
+
+class Timer:
+    __slots__ = ('start', 'due', 'seq', 'callback', 'args', 'interval', 'cancelled')
+
+    def __init__(self, start, due, seq, callback, args, interval):
+        self.start = start
+        self.due = due
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.due, self.seq) < (other.due, other.seq)
+
+    def progress(self, now):
+        # 0..1 through the current wait; lets a view draw a bar without ticks
+        span = self.due - self.start
+        if span <= 0:
+            return 1
+        return min(1, max(0, (now - self.start) / span))
+
+
+class Scheduler:
+    def __init__(self, now=0):
+        self.time = now
+        self._heap = []
+        self._seq = 0
+        self._cancelled = 0
+
+    def __len__(self):
+        return len(self._heap) - self._cancelled
+
+    def _push(self, due, callback, args, interval):
+        self._seq += 1
+        timer = Timer(self.time, due, self._seq, callback, args, interval)
+        heapq.heappush(self._heap, timer)
+        return timer
+
+    def call_at(self, when, callback, *args):
+        return self._push(when, callback, args, None)
+
+    def call_later(self, delay, callback, *args):
+        return self._push(self.time + delay, callback, args, None)
+
+    def call_every(self, interval, callback, *args):
+        if interval <= 0:
+            raise ValueError('interval must be positive')
+        return self._push(self.time + interval, callback, args, interval)
+
+    def cancel(self, timer):
+        if timer is not None and not timer.cancelled:
+            timer.cancelled = True
+            self._cancelled += 1
+            # drop dead entries once they dominate the heap
+            if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+                self._heap[:] = [t for t in self._heap if not t.cancelled]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+    def advance(self, dt):
+        self.run_until(self.time + dt)
+
+    def run_until(self, now):
+        heap = self._heap
+        while heap and heap[0].due <= now:
+            timer = heapq.heappop(heap)
+            if timer.cancelled:
+                self._cancelled -= 1
+                continue
+            # callbacks observe the exact due time, not the frame time
+            self.time = timer.due
+            if timer.interval is not None:
+                timer.start = timer.due
+                timer.due += timer.interval
+                heapq.heappush(heap, timer)
+            else:
+                timer.cancelled = True  # fired; a late cancel() is a no-op
+            timer.callback(*timer.args)
+        self.time = now
@@ -0,0 +1,19 @@
+# Miser 2D - Arabic shaping
+# arabic_reshaper + bidi turn logical Arabic text into joined glyphs in
+# visual order. They are slow enough to show up in a frame profile, so the
+# game never calls them while playing: i18n.py shapes every right-to-left
+# string once when it compiles a catalog. The cache only saves repeats
+# within a build.
+
+import functools
+import arabic_reshaper
+from bidi.algorithm import get_display
+
+CACHE_SIZE = 2048
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def shape(text, base_dir=None):
+    # base_dir 'R' lays the text out as a right-to-left paragraph even when
+    # it starts with Latin letters or has no letters at all
+    return get_display(arabic_reshaper.reshape(text), base_dir=base_dir)
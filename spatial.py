@@ -0,0 +1,79 @@
+# Miser 2D - Uniform grid spatial index
+# Entities register their (x, y) once; proximity queries only look at the
+# cells around the query point, so cost follows local density, not map size.
+
+import math
+
+
+class SpatialGrid:
+    def __init__(self, cell_size=2.0):
+        self.cell_size = cell_size
+        self.cells = {}    # (cx, cy) -> list of objects
+        self._where = {}   # id(obj) -> (cell, x, y)
+
+    def __len__(self):
+        return len(self._where)
+
+    def cell_of(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def insert(self, obj, x, y):
+        if id(obj) in self._where:
+            self.move(obj, x, y)
+            return
+        cell = self.cell_of(x, y)
+        self.cells.setdefault(cell, []).append(obj)
+        self._where[id(obj)] = (cell, x, y)
+
+    def remove(self, obj):
+        entry = self._where.pop(id(obj), None)
+        if entry is None:
+            return
+        bucket = self.cells[entry[0]]
+        bucket.remove(obj)
+        if not bucket:
+            del self.cells[entry[0]]
+
+    def move(self, obj, x, y):
+        entry = self._where.get(id(obj))
+        if entry is None:
+            self.insert(obj, x, y)
+            return
+        cell = self.cell_of(x, y)
+        if cell != entry[0]:
+            self.remove(obj)
+            self.cells.setdefault(cell, []).append(obj)
+        self._where[id(obj)] = (cell, x, y)
+
+    def position(self, obj):
+        entry = self._where[id(obj)]
+        return entry[1], entry[2]
+
+    def query_radius(self, x, y, radius):
+        # every registered object whose position is strictly within radius
+        cs = self.cell_size
+        x0, x1 = math.floor((x - radius) / cs), math.floor((x + radius) / cs)
+        y0, y1 = math.floor((y - radius) / cs), math.floor((y + radius) / cs)
+        r2 = radius * radius
+        found = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = self.cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for obj in bucket:
+                    _, ox, oy = self._where[id(obj)]
+                    if (ox - x) ** 2 + (oy - y) ** 2 < r2:
+                        found.append(obj)
+        return found
+
+    def nearest(self, x, y, radius, accept=None):
+        best, best_d2 = None, radius * radius
+        for obj in self.query_radius(x, y, radius):
+            if accept is not None and not accept(obj):
+                continue
+            _, ox, oy = self._where[id(obj)]
+            d2 = (ox - x) ** 2 + (oy - y) ** 2
+            if d2 < best_d2:
+                best, best_d2 = obj, d2
+        return best
@@ -0,0 +1,190 @@
+# Miser 2D - Gameplay telemetry
+# Structured events from the rules - searches, finds, sales and the coins
+# they bring - for analysing real sessions. The game thread only drops a
+# tuple into a preallocated ring; a writer thread drains it every second
+# into gzip'd NDJSON files, starting a new file once one reaches a size
+# limit and keeping only the newest few. The ring has one writer and one
+# reader and each side only moves its own index, so neither takes a lock.
+# When the writer falls behind, the ring fills and new events are counted
+# and dropped instead of making the frame wait.
+#
+#   MISER_TELEMETRY=telemetry python testursina.py
+#   python telemetry.py telemetry      # what the recorded sessions did
+
+import atexit, gzip, json, os, threading, time
+from pathlib import Path
+
+CAPACITY = 1 << 14        # events buffered between flushes (a power of two)
+FLUSH_EVERY = 1.0         # seconds between writer passes
+MAX_BYTES = 4 << 20       # compressed size at which a file is rotated
+KEEP = 20                 # newest files kept in the folder
+
+# event kind -> names of the fields after its time
+FIELDS = {
+    'search': ('x', 'y'),
+    'search_denied': ('x', 'y'),
+    'found': ('x', 'y', 'item', 'rarity', 'value'),
+    'sold': ('vendor', 'x', 'y', 'items', 'value', 'earned', 'coins'),
+    'sell_denied': ('vendor', 'x', 'y'),
+}
+
+
+class Telemetry:
+    def __init__(self, folder, session=None, capacity=CAPACITY, flush_every=FLUSH_EVERY,
+                 max_bytes=MAX_BYTES, keep=KEEP):
+        assert capacity & (capacity - 1) == 0, 'capacity must be a power of two'
+        self.folder = Path(folder)
+        self.session = session or {}
+        self.ring = [None] * capacity
+        self.mask = capacity - 1
+        self.head = 0       # next slot to fill; only the game thread moves it
+        self.tail = 0       # next slot to write; only the writer moves it
+        self.dropped = 0
+        self.flush_every = flush_every
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.stamp = time.strftime('%Y%m%d-%H%M%S') + f'-{os.getpid()}'
+        self.part = 0
+        self.raw = self.file = None
+        self.reported = 0   # dropped count already written
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._work, name='telemetry', daemon=True)
+        self.thread.start()
+
+    # ----- Game thread -----
+    def emit(self, *event):
+        # (kind, time, *fields); never blocks
+        head = self.head
+        if head - self.tail > self.mask:
+            self.dropped += 1
+            return
+        self.ring[head & self.mask] = event
+        self.head = head + 1
+
+    def close(self):
+        # write what is buffered and close the file
+        if self.thread.is_alive():
+            self.stop.set()
+            self.thread.join()
+
+    # ----- Writer thread -----
+    def _work(self):
+        while not self.stop.wait(self.flush_every):
+            self._flush()
+        self._flush()
+        if self.file is not None:
+            self.file.close()
+            self.raw.close()
+
+    def _drain(self):
+        ring, mask = self.ring, self.mask
+        head = self.head
+        batch = []
+        for i in range(self.tail, head):
+            batch.append(ring[i & mask])
+            ring[i & mask] = None
+        self.tail = head
+        return batch
+
+    def _flush(self):
+        batch = self._drain()
+        lines = []
+        for kind, t, *fields in batch:
+            record = {'t': round(t, 3), 'ev': kind}
+            for name, value in zip(FIELDS[kind], fields):
+                record[name] = round(value, 2) if isinstance(value, float) else value
+            lines.append(json.dumps(record, separators=(',', ':')))
+        dropped = self.dropped
+        if dropped != self.reported:
+            lines.append(json.dumps({'ev': 'dropped', 'count': dropped - self.reported}))
+            self.reported = dropped
+        if not lines:
+            return
+        try:
+            if self.file is None or self.raw.tell() >= self.max_bytes:
+                self._rotate()
+            self.file.write(('\n'.join(lines) + '\n').encode())
+            # a sync flush per pass: a crash loses at most one pass
+            self.file.flush()
+        except OSError as e:
+            print(f'telemetry: {e}')
+
+    def _rotate(self):
+        if self.file is not None:
+            self.file.close()
+            self.raw.close()
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.part += 1
+        path = self.folder / f'{self.stamp}-{self.part:03}.ndjson.gz'
+        self.raw = open(path, 'wb')
+        self.file = gzip.GzipFile(fileobj=self.raw, mode='wb', compresslevel=6)
+        header = {'ev': 'session', 'part': self.part, 'started': self.stamp, **self.session}
+        self.file.write((json.dumps(header) + '\n').encode())
+        for old in sorted(self.folder.glob('*.ndjson.gz'))[:-self.keep]:
+            old.unlink(missing_ok=True)
+
+
+def telemetry_from_env(**session):
+    folder = os.environ.get('MISER_TELEMETRY')
+    if not folder:
+        return None
+    telemetry = Telemetry(folder, session)
+    atexit.register(telemetry.close)
+    return telemetry
+
+
+def read(folder):
+    # every event in the folder's files, oldest file first; a file cut off
+    # by a crash yields what it has
+    for path in sorted(Path(folder).glob('*.ndjson.gz')):
+        with gzip.open(path, 'rt') as f:
+            try:
+                for line in f:
+                    yield json.loads(line)
+            except (EOFError, json.JSONDecodeError):
+                pass
+
+
+if __name__ == '__main__':
+    import argparse, statistics
+    from collections import Counter
+    parser = argparse.ArgumentParser(description='Summarize Miser 2D telemetry')
+    parser.add_argument('folder')
+    parser.add_argument('--top', type=int, default=5)
+    args = parser.parse_args()
+
+    counts, bins, rarities, vendors = Counter(), Counter(), Counter(), Counter()
+    gaps, last = [], None
+    sessions, dropped = set(), 0
+    for e in read(args.folder):
+        kind = e['ev']
+        if kind == 'session':
+            sessions.add(e['started'])
+            last = None
+            continue
+        if kind == 'dropped':
+            dropped += e['count']
+            continue
+        counts[kind] += 1
+        if kind == 'search':
+            bins[(e['x'], e['y'])] += 1
+        elif kind == 'found':
+            rarities[e['rarity']] += 1
+        elif kind == 'sold':
+            vendors[e['vendor']] += e['earned']
+        if kind in ('search', 'search_denied', 'sold', 'sell_denied'):
+            if last is not None:
+                gaps.append(e['t'] - last)
+            last = e['t']
+
+    print(f'{len(sessions)} sessions: ' + '  '.join(f'{k} {n}' for k, n in sorted(counts.items()))
+          + (f'  ({dropped} dropped)' if dropped else ''))
+    if rarities:
+        found = sum(rarities.values())
+        print('rarity   ' + '  '.join(f'{k} {n / found:.1%}' for k, n in rarities.most_common()))
+    if vendors:
+        print('earned   ' + '  '.join(f'{k} {n}' for k, n in vendors.most_common()))
+    if bins:
+        print('top bins ' + '  '.join(f'({x:g}, {y:g}) x{n}' for (x, y), n in bins.most_common(args.top)))
+    if gaps:
+        print(f'between actions: median {statistics.median(gaps):.1f}s  mean {statistics.fmean(gaps):.1f}s')
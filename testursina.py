@@ -1,245 +1,359 @@
 # Miser 2D - Vendor Text Visibility Fix Only
+# One engine for every language: MISER_LANG picks the start-up catalog
+# (locales/, see i18n.py) and L switches language while playing.
+from assets import AssetLoader   # first, so startup timing includes the ursina import
+from assetpack import mount as mount_assets
 from panda3d.core import loadPrcFileData
 loadPrcFileData('', 'load-display pandagl')
 
 from ursina import *
-import random, os, sys, math
+import os, sys, math
+from chunks import streamed_world
+from scheduler import Scheduler
+from ui_layer import SharedTooltip, ToastQueue, ProfilerOverlay
+from profiler import profiler, profiled
+from batching import SpriteAtlas, SpriteBatch, LabelBatch, CrowdSprites
+from fixedstep import FixedStep, STEP
+from replay import session_seed, recorder_from_env
+from scavengers import Scavengers, crowd_size
+from nav import NavGrid, Autopilot
+from savegame import resume_or_start
+from telemetry import telemetry_from_env
+import i18n, fontatlas
 
 # ----- Asset Folder (for EXE builds) -----
 if getattr(sys, 'frozen', False):
     application.asset_folder = os.path.dirname(sys.executable)
 
-app = Ursina(title='Miser 2D')
+# all on-screen text comes from the current catalog, keyed by stable ids
+catalog = i18n.load(i18n.current_language())
+
+app = Ursina(title=catalog.title)
+assets_pack = mount_assets(application.asset_folder)   # None -> loose files
 
 # ----- Window Setup -----
 camera.orthographic = True
 camera.fov = 10
 window.color = color.rgb(13, 13, 13)  # Keep original white background
-Sky(texture='sand_3_1.png')
-
-# ----- Constants -----
-SEARCH_TIME = 5
-COOLDOWN_TIME = 10
-
-# ----- Materials -----
-class MaterialType:
-    Cloth = 'Cloth'
-    Iron = 'Iron'
-    Glass = 'Glass'
-    Seed = 'Seed'
-    Paper = 'Paper'
-    Jewelry = 'Jewelry'
-    AncientCoin = 'Ancient Coin'
-    Gemstone = 'Gemstone'
-
-ITEM_TEMPLATES = [
-    {'name':'Paper', 'value':6, 'material':MaterialType.Paper, 'rarity':'Common'},
-    {'name':'Cloth','value':7,'material':MaterialType.Cloth,'rarity':'Common'},
-    {'name':'Nail','value':8,'material':MaterialType.Iron,'rarity':'Uncommon'},
-    {'name':'Iron','value':10,'material':MaterialType.Iron,'rarity':'Uncommon'},
-    {'name':'Glass','value':9,'material':MaterialType.Glass,'rarity':'Uncommon'},
-    {'name':'Jewelry','value':25,'material':MaterialType.Jewelry,'rarity':'Rare'},
-    {'name':'Ancient Coin','value':40,'material':MaterialType.Jewelry,'rarity':'Epic'},
-    {'name':'Gemstone','value':50,'material':MaterialType.Jewelry,'rarity':'Epic'},
-]
-
-RARITY_MULTIPLIERS = {'Common': 1.0, 'Uncommon': 1.5, 'Rare': 2.0, 'Epic': 3.0}
+# the sand texture streams in; until then the sky matches the window color
+sky = Sky(texture=None, color=window.color)
+
+# ----- Assets -----
+# sounds, fonts and the sky load on a background thread after the first frame
+asset_loader = AssetLoader(application.asset_folder, assets_pack)
+asset_loader.texture('sand_3_1.png', sky, color=color.white)
+
+# ----- Simulation -----
+# game rules live in miser_core; this script only draws the world and feeds it input
+# seeded and stepped at a fixed rate, so MISER_RECORD=<file> captures a
+# session that replay.py reproduces exactly
+# and the last session carries on where it stopped (MISER_SAVE, savegame.py)
+world, chunks, autosave = resume_or_start(streamed_world, session_seed())
+seed = chunks.seed
+# MISER_TELEMETRY=<folder> logs searches, finds and sales for analysis (telemetry.py)
+world.telemetry = telemetry_from_env(seed=seed, lang=catalog.lang)
+# one navigation grid of cached flow fields, shared by the crowd and the autopilot
+nav = NavGrid(world)
+# rival NPCs competing for the same bins; MISER_SCAVENGERS sets how many
+scavengers = Scavengers(world, crowd_size(), seed, nav=nav)
+if autosave is not None:
+    autosave.keep_rng('crowd', scavengers.rng)
+# click to walk somewhere, Q to sell everything at the nearest buyers
+autopilot = Autopilot(world, nav)
+
+def after_step():
+    # chunks follow the simulated player, not the camera, so loading is
+    # part of the deterministic step, and so is the crowd
+    with profiler.section('chunks.update'):
+        chunks.update(world.player.x, world.player.y)
+    with profiler.section('nav.step'):
+        nav.step()
+    with profiler.section('scavengers.step'):
+        scavengers.step(STEP)
+
+sim = FixedStep(world, on_step=after_step, recorder=recorder_from_env(seed, STEP, len(scavengers)), pilot=autopilot)   # [ and ] change speed, P pauses
 
 # ----- Sound -----
-pickup_sound = Audio('item-pickup.mp3', autoplay=False)
-sell_sound = Audio('crp.mp3', autoplay=False)
-error_sound = Audio('error.mp3', autoplay=False)
-search_sound = Audio('search.mp3', autoplay=False)
+# silent until decoded; play() before then is a no-op
+pickup_sound = asset_loader.sound('item-pickup.mp3')
+sell_sound = asset_loader.sound('crp.mp3')
+error_sound = asset_loader.sound('error.mp3')
+search_sound = asset_loader.sound('search.mp3')
 
 # ----- Player -----
 player = Entity(model='quad', color=color.lime, scale=(0.5, 0.5), position=(0, 0))
-player.speed = 4
 player_anim_timer = 0
 player_idle_color = color.lime
 player_move_color = color.green
 
+@profiled('animate_player')
 def animate_player():
     global player_anim_timer
     player_anim_timer += time.dt * 6
     player.color = lerp(player.color, player_move_color if abs(math.sin(player_anim_timer)) > 0.5 else player_idle_color, 0.4)
 
+@profiled('camera_follow')
 def camera_follow():
-    camera.position = lerp(camera.position, (player.x, player.y, -10), 6 * time.dt)
+    # exponential smoothing that settles at the same rate whatever the frame rate
+    camera.position = lerp(camera.position, (player.x, player.y, -10), 1 - math.exp(-6 * time.dt))
 
 # ----- UI -----
-coins = 0
-inventory = []
-
 text_color = color.rgb(10, 10, 10)
 highlight_color = color.rgb(30, 30, 30)
 
-coins_text = Text(text=f'Coins: {coins}', position=window.top_left + Vec2(0.1,-0.05), scale=1.2, color=text_color)
-inv_text = Text(text='Inventory: []', position=window.top + Vec2(0,-0.08), scale=1.0, color=text_color)
-msg_text = Text(text='', position=window.center, scale=1.2, color=color.azure, origin=(0,0))
+coins_text = Text(text=catalog.format('hud.coins', world.coins), position=window.top_left + Vec2(0.1,-0.05), scale=1.2, color=text_color)
+inv_text = Text(text=catalog['hud.inventory_empty'], position=window.top + Vec2(0,-0.08), scale=1.0, color=text_color)
 
 progress_bar = Entity(model='quad', color=color.azure, scale=(0,0.2), position=(0,-0.4))
 progress_bar.visible = False
+active_search = None
 
-def show_msg(text, duration=1.5):
-    msg_text.text = text
-    invoke(lambda: setattr(msg_text, 'text',''), delay=duration)
+ui_timers = Scheduler()
+toasts = ToastQueue(ui_timers, scale=1.2, color=color.azure, origin=(0,0))
+tooltip = SharedTooltip(scale=0.6, color=text_color)
 
-def refresh_inventory():
-    inv_text.text = f"Inventory: {[i['name'] for i in inventory]}"
+profiler_overlay = ProfilerOverlay(profiler, scale=0.7, color=text_color)
 
-def add_coins(amount):
-    global coins
-    coins += amount
-    coins_text.text = f'Coins: {coins}'
+def hud_texts():
+    return [coins_text, inv_text, tooltip.node, *toasts.free, *(node for node, _ in toasts.active)]
 
-def picked_up(item):
-    inventory.append(item)
-    pickup_sound.play()
-    show_msg(f"Found {item['name']} ({item['rarity']})", duration=2)
-    refresh_inventory()
+# all text draws from the language's distance-field glyph atlas (cached on
+# disk), so nothing is rasterized while playing and labels stay sharp. The
+# asset thread loads or builds it after the first frame; until then text
+# uses the default font.
+hud_font = None
 
-# ----- Trash Bin -----
-
-class TrashBin(Entity):
-    def __init__(self, **kwargs):
-        super().__init__(model='quad', texture='trash_bin.png', scale=(0.6,0.6), **kwargs)
-        self.cooldown = 0
-        self.searching = False
-        self.tooltip = Text(parent=camera.ui, text='[E] Search', scale=0.6, color=text_color)
-        self.tooltip.enabled = False
-
-    def update(self):
-        if distance(player.position, self.position) < 1:
-            self.tooltip.enabled = True
-            self.tooltip.position = window.center + Vec2(0, -0.4)
-            if self.cooldown > 0:
-                self.tooltip.text = f"Cooldown: {int(self.cooldown)}s"
-            else:
-                self.tooltip.text = "[E] Search"
-        else:
-            self.tooltip.enabled = False
-
-        if self.cooldown > 0:
-            self.cooldown -= time.dt
-
-    def search(self):
-        if self.cooldown > 0 or self.searching:
-            error_sound.play()
-            show_msg("Can't search yet!")
-            return
+def use_font():
+    lang = catalog.lang
+    asset_loader.font(catalog.font or Text.default_font, fontatlas.glyphs(catalog), lambda font: font_ready(lang, font))
 
-        search_sound.play()  # <-- plays search sound immediately
+def font_ready(lang, font):
+    global hud_font
+    if font is None or lang != catalog.lang:
+        return   # failed, or the language changed again while it loaded
+    hud_font = font
+    for node in hud_texts():
+        # not node.font = ...: ursina's (7.0) Text.font setter only loads font files
+        fontatlas.apply(node, hud_font)
+    relabel()
+
+use_font()
 
-        self.searching = True
+def show_msg(key, *values, duration=1.5):
+    toasts.show(catalog.format(key, *values), duration)
+
+@profiled('refresh_inventory')
+def refresh_inventory():
+    summary = world.inventory.summary()
+    if not summary:
+        inv_text.text = catalog['hud.inventory_empty']
+        return
+    entries = [catalog.format('hud.inventory_item', catalog['item.' + key], n) for key, n in summary]
+    inv_text.text = catalog.format('hud.inventory', catalog.join(entries))
+
+@profiled('refresh_coins')
+def refresh_coins():
+    coins_text.text = catalog.format('hud.coins', world.coins)
+
+# ----- Map Rendering -----
+# every loaded chunk is one sprite batch (bins + vendors, one atlas texture)
+# plus one flattened label batch, instead of an Entity and Text per object
+BIN_TINT = color.white
+COOLDOWN_TINT = color.gray
+LABEL_SCALE = 3.0 * Text.size   # same size the old scale=3.0 scene Text had
+
+VENDOR_TINTS = {
+    'tailor': color.azure,
+    'blacksmith': color.gray,
+    'glassworker': color.cyan,
+    'farmer': color.green,
+    'papermaker': color.orange,
+    'jeweler': color.gold,
+}
+
+atlas = SpriteAtlas(['trash_bin.png'])
+chunk_views = {}   # chunk key -> (SpriteBatch, LabelBatch)
+bin_slots = {}     # id(bin) -> (SpriteBatch, instance index, bin)
+
+@profiled('build_chunk')
+def build_chunk(chunk):
+    sprites = SpriteBatch(atlas)
+    for b in chunk.bins:
+        bin_slots[id(b)] = (sprites, sprites.add(b.x, b.y, 0.6, 0.6, 'trash_bin.png'), b)
+    for v in chunk.vendors:
+        sprites.add(v.x, v.y, 0.7, 0.7, tint=VENDOR_TINTS.get(v.key, color.brown))
+    chunk_views[chunk.key] = (sprites.build(), build_labels(chunk))
+    for b in chunk.bins:
+        if world.cooldown(b) > 0:
+            tint_cooling(b)
+
+def build_labels(chunk):
+    labels = LabelBatch(hud_font or Text.default_font)
+    for v in chunk.vendors:
+        labels.add(catalog['vendor.' + v.key], v.x, v.y + 1, LABEL_SCALE)   # above vendor
+    labels.build()
+    if hud_font is not None:
+        fontatlas.distance_field(labels.root)
+    return labels
+
+def relabel():
+    for key, (sprites, labels) in list(chunk_views.items()):
+        chunk = chunks.loaded.get(key)
+        if chunk is not None:
+            labels.destroy()
+            chunk_views[key] = (sprites, build_labels(chunk))
+
+@profiled('drop_chunk')
+def drop_chunk(chunk):
+    sprites, labels = chunk_views.pop(chunk.key)
+    for b in chunk.bins:
+        bin_slots.pop(id(b), None)
+    sprites.destroy()
+    labels.destroy()
+
+def tint_cooling(b):
+    slot = bin_slots.get(id(b))
+    if slot and slot[2] is b:
+        slot[0].set_tint(slot[1], COOLDOWN_TINT)
+        world.scheduler.call_at(b.ready_at, untint, b)   # simulation time, so it follows the speed
+
+def untint(b):
+    slot = bin_slots.get(id(b))
+    if slot and slot[2] is b:
+        slot[0].set_tint(slot[1], BIN_TINT)
+
+def tooltip_text(state):
+    if state.kind == 'bin':
+        cooldown = world.cooldown(state)
+        if cooldown > 0:
+            return catalog.format('hint.cooldown', int(cooldown))
+        return catalog['hint.search']
+    # the vendor's going rate, which sags as the crowd sells to it
+    return catalog.format('hint.sell_price', catalog['vendor.' + state.key], round(world.market.price(state, world.time) * 100))
+
+# the whole crowd is one instanced draw fed straight from the scavenger arrays
+crowd = CrowdSprites(len(scavengers), 0.35, tint=color.orange)
+
+# ----- World Events -----
+def handle_event(event):
+    global active_search
+    kind = event[0]
+    if kind == 'chunk_loaded':
+        build_chunk(event[1])
+    elif kind == 'chunk_unloaded':
+        drop_chunk(event[1])
+    elif kind == 'scavenged':
+        tint_cooling(event[1])
+    elif kind == 'despawned':
+        if event[1] is active_search:
+            active_search = None
+            progress_bar.visible = False
+    elif kind == 'search_started':
+        search_sound.play()  # <-- plays search sound immediately
+        active_search = event[1]
         progress_bar.visible = True
         progress_bar.scale_x = 0
-
-        def do_search():
-            r = random.random()
-            if r < 0.6: rarity = 'Common'
-            elif r < 0.85: rarity = 'Uncommon'
-            elif r < 0.95: rarity = 'Rare'
-            else: rarity = 'Epic'
-
-            valid_items = [i for i in ITEM_TEMPLATES if i['rarity'] == rarity]
-            item = random.choice(valid_items)
-            item_copy = dict(item)
-            item_copy['value'] = int(item['value'] * RARITY_MULTIPLIERS[rarity])
-            picked_up(item_copy)
-
-            self.cooldown = COOLDOWN_TIME
-            self.searching = False
+    elif kind == 'search_denied':
+        error_sound.play()
+        show_msg('msg.search_denied')
+    elif kind == 'found':
+        item = event[2]
+        if event[1] is active_search:
+            active_search = None
             progress_bar.visible = False
-
-        def update_bar():
-            if not self.searching:
-                return
-            progress_bar.scale_x += (1/SEARCH_TIME) * time.dt * 10
-            if progress_bar.scale_x >= 10:
-                progress_bar.scale_x = 10
-                do_search()
-                return
-            invoke(update_bar, delay=0.1)
-
-        invoke(update_bar, delay=0.1)
-        invoke(do_search, delay=SEARCH_TIME)
-# ----- Vendor -----
-class Vendor(Entity):
-    def __init__(self, name, accepts, color_tint=color.brown, **kwargs):
-        super().__init__(model='quad', color=color_tint, scale=(0.7,0.7), **kwargs)
-        self.name = name
-        self.accepts = accepts
-        self.tooltip = Text(parent=camera.ui, text=f'[E] Sell to {name}', scale=0.6, color=color.black)
-        self.tooltip.enabled = False
-        
-        # ---- FIX: text not parented to vendor, so scale is real ----
-        self.label = Text(
-            text=name,
-            parent=scene,               # NOT self
-            scale=3.0,                  # big enough now
-            color=color.black,
-            origin=(0,0),
-        )
-        self.label.world_position = self.world_position + Vec3(0, 1, 0)  # above vendor
-
-    def update(self):
-        # Move label with vendor
-        self.label.world_position = self.world_position + Vec3(0, 1, 0)
-
-        if distance(player.position, self.position) < 1:
-            self.tooltip.enabled = True
-            self.tooltip.position = window.center + Vec2(0, -0.4)
-        else:
-            self.tooltip.enabled = False
-
-
-    def sell_items(self):
-        sold = 0
-        for i in range(len(inventory)-1, -1, -1):
-            it = inventory[i]
-            if it['material'] == self.accepts:
-                add_coins(it['value'])
-                inventory.pop(i)
-                sold += 1
+        tint_cooling(event[1])
+        pickup_sound.play()
+        show_msg('msg.found', catalog['item.' + item.key], catalog['rarity.' + item.rarity], duration=2)
         refresh_inventory()
-        if sold > 0:
-            sell_sound.play()
-            show_msg(f"Sold {sold} item(s) to {self.name}")
-        else:
-            error_sound.play()
-            show_msg(f"{self.name} doesn't buy your items")
-
-# ----- Trash Bins & Vendors -----
-trash_bins = [TrashBin(position=(random.uniform(-5,5), random.uniform(-3,3))) for _ in range(6)]
-vendors = [
-    Vendor('Tailor', MaterialType.Cloth, color_tint=color.azure, position=(-6, 2)),
-    Vendor('Blacksmith', MaterialType.Iron, color_tint=color.gray, position=(6, 2)),
-    Vendor('Glassworker', MaterialType.Glass, color_tint=color.cyan, position=(-6, -2)),
-    Vendor('Farmer', MaterialType.Seed, color_tint=color.green, position=(6, -2)),
-    Vendor('Papermaker', MaterialType.Paper, color_tint=color.orange, position=(0, 4)),
-    Vendor('Jeweler', MaterialType.Jewelry, color_tint=color.gold, position=(0, -4)),
-]
+    elif kind == 'sold':
+        _, vendor, sold, earned, _ = event
+        refresh_coins()
+        refresh_inventory()
+        sell_sound.play()
+        show_msg('msg.sold', sold, catalog['vendor.' + vendor.key], earned)
+    elif kind == 'sell_denied':
+        error_sound.play()
+        show_msg('msg.sell_denied', catalog['vendor.' + event[1].key])
+    elif kind == 'autopilot':
+        if event[1] == 'nothing_to_sell':
+            show_msg('msg.nothing_to_sell')
+
+# ----- Proximity -----
+@profiled('update_tooltip')
+def update_tooltip():
+    target = world.nearest()
+    if target is None:
+        tooltip.hide()
+    else:
+        tooltip.show(tooltip_text(target))
+
+# ----- Language -----
+def set_language(lang):
+    # one catalog load (none if it was used before), then redraw what shows text
+    global catalog
+    catalog = i18n.load(lang)
+    window.title = catalog.title
+    toasts.clear()
+    use_font()
+    refresh_coins()
+    refresh_inventory()
+    relabel()
+    show_msg('msg.language')
 
 # ----- Player Control -----
 def update():
+    profiler.frame(time.dt)
+    with profiler.section('ui_timers'):
+        ui_timers.advance(time.dt)
+    move = (held_keys['d'] - held_keys['a'], held_keys['w'] - held_keys['s'])
+    if move != (0, 0) and autopilot.active:
+        autopilot.cancel()   # the keyboard always wins
+    with profiler.section('world.step'):
+        sim.advance(time.dt, move)
+
+    player.position = sim.player_position()
+    with profiler.section('crowd'):
+        crowd.update(scavengers.positions(sim.alpha))
     camera_follow()
-    move = Vec2(held_keys['d'] - held_keys['a'], held_keys['w'] - held_keys['s']).normalized()
-    player.position += move * time.dt * player.speed
-    if move.length() > 0:
+    if world.player.moving:
         animate_player()
 
+    with profiler.section('events'):
+        for event in world.drain_events():
+            handle_event(event)
+    update_tooltip()
+    profiler_overlay.update(time.dt)
+    if autosave is not None:
+        with profiler.section('autosave'):
+            autosave.update(time.dt)
+    if active_search is not None:
+        progress_bar.scale_x = 10 * world.search_progress(active_search)
+
 def input(key):
     if key == 'e':
-        for bin in trash_bins:
-            if distance(player.position, bin.position) < 1:
-                bin.search()
-                return
-        for vendor in vendors:
-            if distance(player.position, vendor.position) < 1:
-                vendor.sell_items()
-                return
+        sim.press('e')
+    elif key == ']':
+        show_msg('msg.speed', f'{sim.faster():g}')
+    elif key == '[':
+        show_msg('msg.speed', f'{sim.slower():g}')
+    elif key == 'p':
+        show_msg('msg.paused' if sim.toggle_pause() else 'msg.resumed')
+    elif key == 'l':
+        languages = i18n.languages()
+        set_language(languages[(languages.index(catalog.lang) + 1) % len(languages)])
+    elif key == 'left mouse down':
+        # orthographic camera: the view is camera.fov world units tall
+        autopilot.go_to(camera.x + mouse.x * camera.fov, camera.y + mouse.y * camera.fov)
+    elif key == 'q':
+        autopilot.auto_sell()
+    trace = profiler_overlay.input(key)
+    if trace:
+        show_msg('msg.trace_saved', trace)
 
 # ----- Start -----
-show_msg('Use WASD to move, E to search or sell.', duration=4)
+asset_loader.start()
+for event in world.drain_events():
+    handle_event(event)
+refresh_inventory()   # a resumed game starts with its items
+show_msg('msg.help', duration=4)
 app.run()
-
@@ -0,0 +1,120 @@
+# Miser 2D - Shared tooltip and pooled toast messages
+# One tooltip Text for the whole map (it follows the nearest interactable)
+# and a fixed pool of recycled Text nodes for messages. Text is only
+# reassigned when its content changes, so idle frames regenerate no glyphs.
+
+from collections import deque
+from ursina import Text, camera, window, Vec2
+
+
+class SharedTooltip:
+    def __init__(self, position=None, **text_kwargs):
+        # window.center only exists once Ursina() has opened the window
+        if position is None:
+            position = window.center + Vec2(0, -0.4)
+        self.node = Text(parent=camera.ui, text='', position=position, **text_kwargs)
+        self.node.enabled = False
+        self.content = None
+        self.position = position
+
+    def show(self, content, position=None):
+        if content != self.content:
+            self.node.text = content
+            self.content = content
+        if position is not None and position != self.position:
+            self.node.position = position
+            self.position = position
+        if not self.node.enabled:
+            self.node.enabled = True
+
+    def hide(self):
+        if self.node.enabled:
+            self.node.enabled = False
+
+
+class ToastQueue:
+    # newest toast sits at `position`, older ones stack upward by `spacing`;
+    # when the pool is full the oldest toast is recycled for the new one
+    def __init__(self, scheduler, pool_size=3, position=None, spacing=0.05, **text_kwargs):
+        if position is None:
+            position = window.center
+        self.scheduler = scheduler
+        self.position = position
+        self.spacing = spacing
+        self.free = [Text(parent=camera.ui, text='', position=position, **text_kwargs) for _ in range(pool_size)]
+        for node in self.free:
+            node.enabled = False
+        self.active = deque()  # [node, timer], oldest first
+
+    def show(self, content, duration=1.5):
+        if self.free:
+            node = self.free.pop()
+        else:
+            node, timer = self.active.popleft()
+            self.scheduler.cancel(timer)
+        if node.text != content:
+            node.text = content
+        node.enabled = True
+        entry = [node, None]
+        entry[1] = self.scheduler.call_later(duration, self._expire, entry)
+        self.active.append(entry)
+        self._layout()
+
+    def clear(self):
+        while self.active:
+            node, timer = self.active.popleft()
+            self.scheduler.cancel(timer)
+            node.enabled = False
+            self.free.append(node)
+
+    def _expire(self, entry):
+        self.active.remove(entry)
+        entry[0].enabled = False
+        self.free.append(entry[0])
+        self._layout()
+
+    def _layout(self):
+        count = len(self.active)
+        for i, (node, _) in enumerate(self.active):
+            node.position = self.position + Vec2(0, (count - 1 - i) * self.spacing)
+
+
+class ProfilerOverlay:
+    # F3 toggles profiling and this readout, F4 dumps a Chrome trace
+    def __init__(self, profiler, refresh=0.25, rows=8, position=None, **text_kwargs):
+        if position is None:
+            position = window.top_right + Vec2(-0.5, -0.05)
+        self.profiler = profiler
+        self.refresh = refresh
+        self.rows = rows
+        self.elapsed = 0
+        self.node = Text(parent=camera.ui, text='', position=position, **text_kwargs)
+        self.node.enabled = profiler.enabled
+
+    def update(self, dt):
+        if not self.profiler.enabled:
+            return
+        self.elapsed += dt
+        if self.elapsed < self.refresh:
+            return
+        self.elapsed = 0
+        p = self.profiler.percentiles()
+        lines = [f'frame p50 {p[50]*1000:.2f}  p95 {p[95]*1000:.2f}  p99 {p[99]*1000:.2f} ms']
+        for name, ms, calls in self.profiler.per_frame()[:self.rows]:
+            lines.append(f'{name:<18}{ms:7.3f} ms  x{calls:.1f}')
+        content = '\n'.join(lines)
+        if content != self.node.text:
+            self.node.text = content
+        self.profiler.reset_window()
+
+    def toggle(self):
+        self.profiler.enabled = not self.profiler.enabled
+        self.profiler.reset_window()
+        self.node.enabled = self.profiler.enabled
+
+    def input(self, key):
+        # returns the trace path when one was written
+        if key == 'f3':
+            self.toggle()
+        elif key == 'f4' and self.profiler.enabled:
+            return self.profiler.dump_trace()